@@ -5,6 +5,7 @@ Extracted from auth.py validation functions
 import os
 import re
 import logging
+from functools import lru_cache
 from typing import Tuple  # Added missing import
 
 try:
@@ -13,13 +14,19 @@ except ValueError:
     MIN_PASSWORD_LENGTH = 6
 EMAIL_PATTERN = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
 
+# Compiled once at import instead of on every validation
+_EMAIL_RE = re.compile(EMAIL_PATTERN)
+_LETTER_RE = re.compile(r'[A-Za-z]')
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]+$')
+
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1024)
 def validate_email(email: str) -> bool:
     """Validate email format"""
     if not email or not isinstance(email, str):
         return False
-    return re.match(EMAIL_PATTERN, email.strip()) is not None
+    return _EMAIL_RE.match(email.strip()) is not None
 
 def validate_password(password: str) -> Tuple[bool, str]:
     """Enhanced password validation"""
@@ -30,11 +37,12 @@ def validate_password(password: str) -> Tuple[bool, str]:
         return False, f"Password must be at least {MIN_PASSWORD_LENGTH} characters long"
     
     # Check for at least one letter
-    if not re.search(r'[A-Za-z]', password):
+    if not _LETTER_RE.search(password):
         return False, "Password must contain at least one letter"
     
     return True, "Password is valid"
 
+@lru_cache(maxsize=1024)
 def validate_username(username: str) -> Tuple[bool, str]:
     """Validate username format"""
     if not username or not isinstance(username, str):
@@ -49,7 +57,7 @@ def validate_username(username: str) -> Tuple[bool, str]:
         return False, "Username must be less than 30 characters"
     
     # Only allow alphanumeric and underscore
-    if not re.match(r'^[a-zA-Z0-9_]+$', username):
+    if not _USERNAME_RE.match(username):
         return False, "Username can only contain letters, numbers, and underscores"
     
     return True, "Username is valid"
@@ -58,6 +58,8 @@ RECOGNITION_MARGIN = float(get_config_value("RECOGNITION_MARGIN", "0.08"))
 ALLOW_SKIP_DETECTION_FALLBACK = get_config_value(
     "ALLOW_SKIP_DETECTION_FALLBACK", "false"
 ).lower() in ("1", "true", "yes")
+# Score the recognition gallery with int8-quantized templates (4x less memory traffic; tiny accuracy cost).
+RECOGNITION_INT8_GALLERY = _get_bool_config("RECOGNITION_INT8_GALLERY", "false")
 
 # Biometric data controls
 BIOMETRIC_CACHE_ENABLED = _get_bool_config("BIOMETRIC_CACHE_ENABLED", "false")
@@ -69,6 +71,9 @@ BIOMETRIC_HARD_DELETE_ON_STUDENT_DELETE = _get_bool_config(
     "true",
 )
 
+# Default analytics window (days); the analytics page can widen it on demand
+ANALYTICS_DEFAULT_DAYS = int(get_config_value("ANALYTICS_DEFAULT_DAYS", "14"))
+
 # UI settings
 PAGE_TITLE = "🎓 Smart Face Attendance System"
 PAGE_ICON = "🎓"
@@ -7,6 +7,7 @@ import pandas as pd
 from typing import List, Dict, Optional, Tuple
 from datetime import date, datetime, timedelta
 from database.connection import get_db_connection
+from utils.cache import analytics_cache, attendance_date_tag
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,7 @@ class AttendanceRepository:
                             WHERE id = ?
                         ''', (now, marked_by, existing['id']))
                         conn.commit()
+                        analytics_cache.invalidate_tag(attendance_date_tag(today))
                         return True, f"Time-out marked for {student_name}"
                     else:
                         return False, f"Attendance already marked for {student_name} today"
@@ -57,6 +59,7 @@ class AttendanceRepository:
                         VALUES (?, ?, ?, ?, ?)
                     ''', (student_id, today, now, status, marked_by))
                     conn.commit()
+                    analytics_cache.invalidate_tag(attendance_date_tag(today))
                     
                     logger.info(f"Attendance marked for student {student_name}")
                     return True, f"Attendance marked for {student_name}"
@@ -118,6 +121,66 @@ class AttendanceRepository:
             logger.error(f"Error getting attendance records: {e}")
             return []
     
+    def get_present_counts_by_student(self, student_ids: List[int], start_date: date) -> Dict[int, int]:
+        """Count 'present' days since start_date for each student in one grouped query"""
+        if not student_ids:
+            return {}
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                placeholders = ",".join("?" for _ in student_ids)
+                cursor.execute(f'''
+                    SELECT student_id, SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present_count
+                    FROM attendance
+                    WHERE date >= ? AND student_id IN ({placeholders})
+                    GROUP BY student_id
+                ''', (start_date, *student_ids))
+                
+                return {row['student_id']: row['present_count'] for row in cursor}
+                
+        except Exception as e:
+            logger.error(f"Error getting present counts: {e}")
+            return {}
+    
+    def get_student_period_summary(self, student_id: int, start_date: date) -> Dict:
+        """Present, time-in and time-out day counts for one student since start_date"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT 
+                        COALESCE(SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END), 0) as present_days,
+                        COUNT(time_in) as time_in_count,
+                        COUNT(time_out) as time_out_count
+                    FROM attendance
+                    WHERE student_id = ? AND date >= ?
+                ''', (student_id, start_date))
+                
+                return dict(cursor.fetchone())
+                
+        except Exception as e:
+            logger.error(f"Error getting student period summary: {e}")
+            return {'present_days': 0, 'time_in_count': 0, 'time_out_count': 0}
+    
+    def get_hourly_distribution(self, start_date: date) -> Dict[int, int]:
+        """Check-ins per hour of day since start_date, for hours that have any"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT time_in_sod / 3600 as hour, COUNT(*) as check_ins
+                    FROM attendance
+                    WHERE date >= ? AND time_in_sod IS NOT NULL
+                    GROUP BY hour
+                    ORDER BY hour
+                ''', (start_date,))
+                
+                return {row['hour']: row['check_ins'] for row in cursor}
+                
+        except Exception as e:
+            logger.error(f"Error getting hourly distribution: {e}")
+            return {}
+    
     def get_today_stats(self) -> Dict:
         """Get today's attendance statistics"""
         try:
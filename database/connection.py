@@ -10,6 +10,12 @@ from config.settings import DB_FILE, DB_TIMEOUT, ENABLE_FOREIGN_KEYS
 
 logger = logging.getLogger(__name__)
 
+# Seconds since midnight of attendance.time_in, truncated to the minute
+_TIME_IN_SOD_SQL = (
+    "CAST(strftime('%H', {col}) AS INTEGER) * 3600 + "
+    "CAST(strftime('%M', {col}) AS INTEGER) * 60"
+)
+
 @contextmanager
 def get_db_connection():
     """SQLite connection context manager with proper error handling"""
@@ -23,6 +29,8 @@ def get_db_connection():
         
         if ENABLE_FOREIGN_KEYS:
             connection.execute("PRAGMA foreign_keys = ON")
+        # Safe with WAL (set once in init_database); avoids an fsync per commit
+        connection.execute("PRAGMA synchronous = NORMAL")
         
         yield connection
         
@@ -85,12 +93,44 @@ def _ensure_auxiliary_schema(cursor, conn) -> None:
         logger.warning("User table TOTP columns: %s", e)
 
 
+def _ensure_attendance_time_in_sod(cursor) -> None:
+    """Add and backfill attendance.time_in_sod; triggers keep it in sync on every write."""
+    if "time_in_sod" not in _table_columns(cursor, "attendance"):
+        cursor.execute("ALTER TABLE attendance ADD COLUMN time_in_sod INTEGER")
+        cursor.execute(
+            f"UPDATE attendance SET time_in_sod = {_TIME_IN_SOD_SQL.format(col='time_in')} "
+            "WHERE time_in IS NOT NULL"
+        )
+    sod = _TIME_IN_SOD_SQL.format(col="NEW.time_in")
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_time_in_sod_insert
+        AFTER INSERT ON attendance
+        BEGIN
+            UPDATE attendance SET time_in_sod = {sod} WHERE id = NEW.id;
+        END
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_time_in_sod_update
+        AFTER UPDATE OF time_in ON attendance
+        BEGIN
+            UPDATE attendance SET time_in_sod = {sod} WHERE id = NEW.id;
+        END
+        """
+    )
+
+
 def init_database():
     """Initialize database with all required tables and admin user"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
+            # WAL is persistent on the database file and lets readers run concurrently
+            cursor.execute("PRAGMA journal_mode = WAL")
+            
             # Create users table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -151,9 +191,11 @@ def init_database():
                     UNIQUE(student_id, date)
                 )
             ''')
+            _ensure_attendance_time_in_sod(cursor)
             
             # Create indexes for better performance
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_roll ON students(roll_number)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_course_ci ON students(lower(course))')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_student ON attendance(student_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
@@ -8,6 +8,7 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from database.connection import get_db_connection
+from utils.cache import STUDENTS_TAG, analytics_cache
 from config.settings import (
     BIOMETRIC_HARD_DELETE_ON_STUDENT_DELETE,
     BIOMETRIC_RETENTION_DAYS,
@@ -16,6 +17,21 @@ from config.settings import (
 
 logger = logging.getLogger(__name__)
 
+
+def _student_from_row(row) -> Dict:
+    """Student dict as returned by the listing/lookup methods (row needs photo_count)"""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'roll_number': row['roll_number'],
+        'email': row['email'],
+        'phone': row['phone'],
+        'course': row['course'],
+        'photo_count': row['photo_count'],
+        'created_at': row['created_at']
+    }
+
+
 class StudentRepository:
     """Handle all student-related database operations"""
     
@@ -53,6 +69,7 @@ class StudentRepository:
                     ''', (student_id, embedding_b64, photo_id))
                 
                 conn.commit()
+                analytics_cache.invalidate_tag(STUDENTS_TAG)
                 logger.info(f"Student {name} added with {len(embeddings_data)} face embeddings")
                 return True, f"Student {name} added successfully"
                 
@@ -74,25 +91,107 @@ class StudentRepository:
                     ORDER BY s.name
                 ''')
                 
-                students = []
-                for row in cursor.fetchall():
-                    students.append({
-                        'id': row['id'],
-                        'name': row['name'],
-                        'roll_number': row['roll_number'],
-                        'email': row['email'],
-                        'phone': row['phone'],
-                        'course': row['course'],
-                        'photo_count': row['photo_count'],
-                        'created_at': row['created_at']
-                    })
-                
-                return students
+                return [_student_from_row(row) for row in cursor]
                 
         except Exception as e:
             logger.error(f"Error getting students: {e}")
             return []
     
+    def search(self, term: str) -> List[Dict]:
+        """Active students whose name, roll number or email contains term (case-insensitive)"""
+        try:
+            pattern = "%" + term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT s.*, COUNT(fe.id) as photo_count
+                    FROM students s
+                    LEFT JOIN face_embeddings fe ON s.id = fe.student_id
+                    WHERE s.is_active = 1 AND (
+                        lower(s.name) LIKE ? ESCAPE '\\'
+                        OR lower(s.roll_number) LIKE ? ESCAPE '\\'
+                        OR lower(s.email) LIKE ? ESCAPE '\\'
+                    )
+                    GROUP BY s.id
+                    ORDER BY s.name
+                ''', (pattern, pattern, pattern))
+                
+                return [_student_from_row(row) for row in cursor]
+                
+        except Exception as e:
+            logger.error(f"Error searching students: {e}")
+            return []
+    
+    def get_by_course(self, course: str) -> List[Dict]:
+        """Active students enrolled in course (case-insensitive, uses idx_students_course_ci)"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT s.*, COUNT(fe.id) as photo_count
+                    FROM students s
+                    LEFT JOIN face_embeddings fe ON s.id = fe.student_id
+                    WHERE s.is_active = 1 AND lower(s.course) = lower(?)
+                    GROUP BY s.id
+                    ORDER BY s.name
+                ''', (course,))
+                
+                return [_student_from_row(row) for row in cursor]
+                
+        except Exception as e:
+            logger.error(f"Error getting students by course: {e}")
+            return []
+    
+    def get_statistics(self) -> Dict:
+        """Active student totals, per-course counts and photo coverage in one grouped query"""
+        stats = {'total_students': 0, 'by_course': {}, 'with_photos': 0, 'without_photos': 0}
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT s.course,
+                           COUNT(*) as students,
+                           SUM(EXISTS (
+                               SELECT 1 FROM face_embeddings fe WHERE fe.student_id = s.id
+                           )) as with_photos
+                    FROM students s
+                    WHERE s.is_active = 1
+                    GROUP BY s.course
+                ''')
+                
+                for row in cursor:
+                    stats['by_course'][row['course']] = row['students']
+                    stats['total_students'] += row['students']
+                    stats['with_photos'] += row['with_photos']
+                stats['without_photos'] = stats['total_students'] - stats['with_photos']
+                return stats
+                
+        except Exception as e:
+            logger.error(f"Error getting student statistics: {e}")
+            return {'total_students': 0, 'by_course': {}, 'with_photos': 0, 'without_photos': 0}
+    
+    def get_student(self, student_id: int) -> Optional[Dict]:
+        """Get one active student by primary key"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT s.*,
+                        (SELECT COUNT(*) FROM face_embeddings fe WHERE fe.student_id = s.id) as photo_count
+                    FROM students s
+                    WHERE s.id = ? AND s.is_active = 1
+                ''', (student_id,))
+                
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                
+                return _student_from_row(row)
+                
+        except Exception as e:
+            logger.error(f"Error getting student {student_id}: {e}")
+            return None
+    
     def delete_student(self, student_id: int) -> Tuple[bool, str]:
         """Soft delete student (mark as inactive)"""
         try:
@@ -113,6 +212,7 @@ class StudentRepository:
                     (student_id,),
                 )
                 conn.commit()
+                analytics_cache.invalidate_tag(STUDENTS_TAG)
                 
                 logger.info(f"Student {student['name']} deleted")
                 return True, f"Student {student['name']} deleted successfully"
@@ -143,6 +243,7 @@ class StudentRepository:
                     (student["id"],),
                 )
                 conn.commit()
+                analytics_cache.invalidate_tag(STUDENTS_TAG)
 
                 logger.info("Student %s deleted by roll number %s", student["name"], roll_number)
                 return True, f"Student {student['name']} deleted successfully"
@@ -231,6 +332,77 @@ class StudentRepository:
             logger.error(f"Error getting student embeddings: {e}")
             return []
     
+    def get_embeddings_version(self) -> Tuple[int, int, int]:
+        """Cheap fingerprint of the active embedding set (changes on enrolment or deletion)"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT COUNT(*), COALESCE(MAX(fe.id), 0), COALESCE(SUM(fe.id), 0)
+                    FROM students s
+                    JOIN face_embeddings fe ON s.id = fe.student_id
+                    WHERE s.is_active = 1
+                ''')
+                return tuple(cursor.fetchone())
+                
+        except Exception as e:
+            logger.error(f"Error getting embeddings version: {e}")
+            return (0, 0, 0)
+    
+    def get_embedding_matrix(self) -> Tuple[np.ndarray, np.ndarray, Dict[int, Tuple[str, str]]]:
+        """Active students' embeddings as one contiguous matrix for recognition
+        
+        Returns (matrix, ids, metadata_by_id): an (N, EMBEDDING_SIZE) float32
+        matrix of L2-normalized rows, the (N,) student id of each row, and
+        {student_id: (name, roll_number)}.
+        """
+        matrix = np.empty((0, EMBEDDING_SIZE), dtype=np.float32)
+        ids = np.empty(0, dtype=np.int64)
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT COUNT(*) FROM students s
+                    JOIN face_embeddings fe ON s.id = fe.student_id
+                    WHERE s.is_active = 1
+                ''')
+                capacity = cursor.fetchone()[0]
+                matrix = np.zeros((capacity, EMBEDDING_SIZE), dtype=np.float32)
+                ids = np.empty(capacity, dtype=np.int64)
+                metadata_by_id: Dict[int, Tuple[str, str]] = {}
+                
+                cursor.execute('''
+                    SELECT s.id, s.name, s.roll_number, fe.embedding_data
+                    FROM students s
+                    JOIN face_embeddings fe ON s.id = fe.student_id
+                    WHERE s.is_active = 1
+                ''')
+                
+                n = 0
+                for row in cursor:
+                    if n == capacity:
+                        break
+                    try:
+                        embedding = np.frombuffer(base64.b64decode(row['embedding_data']), dtype=np.float32)
+                    except Exception as e:
+                        logger.warning(f"Error decoding embedding for student {row['name']}: {e}")
+                        continue
+                    # Truncate or zero-pad to EMBEDDING_SIZE, as get_student_embeddings does
+                    size = min(len(embedding), EMBEDDING_SIZE)
+                    matrix[n, :size] = embedding[:size]
+                    ids[n] = row['id']
+                    metadata_by_id.setdefault(row['id'], (row['name'], row['roll_number']))
+                    n += 1
+                
+                matrix, ids = matrix[:n], ids[:n]
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                np.divide(matrix, norms, out=matrix, where=norms > 0)
+                return matrix, ids, metadata_by_id
+                
+        except Exception as e:
+            logger.error(f"Error getting embedding matrix: {e}")
+            return np.empty((0, EMBEDDING_SIZE), dtype=np.float32), np.empty(0, dtype=np.int64), {}
+    
     def delete_all_students(self) -> Tuple[bool, str]:
         """Delete all students and their data"""
         try:
@@ -250,6 +422,7 @@ class StudentRepository:
                 cursor.execute("DELETE FROM students")
                 
                 conn.commit()
+                analytics_cache.clear()
                 
                 logger.info(f"Deleted {count} students and all related data")
                 return True, f"Successfully deleted {count} students and all related data"
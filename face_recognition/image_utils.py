@@ -6,6 +6,7 @@ import os
 import numpy as np
 import cv2
 import logging
+from functools import lru_cache
 from typing import Tuple, Optional
 
 from utils.image_converter import ImageConverter, validate_image_for_cv2
@@ -26,6 +27,11 @@ def _deepface():
             "Install project dependencies with: pip install -r requirements.txt"
         ) from exc
 
+@lru_cache(maxsize=1)
+def get_face_cascade():
+    """OpenCV's frontal-face Haar cascade, parsed once per process and shared by its callers."""
+    return cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
 def ensure_rgb(frame_bgr):
     """Convert BGR to RGB for DeepFace compatibility with proper validation"""
     try:
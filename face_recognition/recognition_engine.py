@@ -2,11 +2,13 @@
 Face recognition processing engine - Enhanced version
 Extracted from face_utils.py recognition functions with better error handling
 """
+import hashlib
 import numpy as np
 import cv2
 import logging
-from collections import defaultdict
-from typing import Tuple, Optional, List, Dict, Any
+import threading
+from concurrent.futures import Future
+from typing import Tuple, Optional, List, Dict, Any, NamedTuple, Union
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Suppress TensorFlow warnings
 
@@ -17,14 +19,21 @@ from config.settings import (
     RECOGNITION_THRESHOLD,
     RECOGNITION_MARGIN,
     ALLOW_SKIP_DETECTION_FALLBACK,
+    RECOGNITION_INT8_GALLERY,
 )
 from face_recognition.image_utils import (
     ensure_rgb, resize_embedding_to_512, validate_image_quality,
     detect_face_in_image, preprocess_image_for_embedding
 )
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+def _image_key(image: np.ndarray) -> Tuple:
+    """Content key for a probe image (shape, dtype and a 128-bit digest of its pixels)."""
+    digest = hashlib.blake2b(np.ascontiguousarray(image), digest_size=16).digest()
+    return image.shape, image.dtype.str, digest
+
 
 def _deepface():
     """Import DeepFace lazily so decision-logic tests can run without ML deps."""
@@ -38,6 +47,84 @@ def _deepface():
             "Install project dependencies with: pip install -r requirements.txt"
         ) from exc
 
+class EmbeddingGallery(NamedTuple):
+    """Recognition gallery prepared once for matrix scoring.
+    
+    Rows of ``matrix`` are L2-normalized templates; ``row_student`` maps each
+    row to its index in ``student_ids``/``students``. When quantized,
+    ``quantized[i] / scales[i]`` approximates ``matrix[i]``.
+    """
+    matrix: np.ndarray  # (N, D) float32, C-contiguous
+    row_student: np.ndarray  # (N,) index into student_ids
+    student_ids: np.ndarray  # (S,) unique student ids
+    students: List[Tuple[str, str]]  # (name, roll_number) per student_ids entry
+    quantized: Optional[np.ndarray] = None  # (N, D) int8
+    scales: Optional[np.ndarray] = None  # (N,) float32
+
+
+def _quantize_int8(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (int8 values, float32 scales)."""
+    x = np.atleast_2d(x)
+    peak = np.abs(x).max(axis=1) if x.size else np.zeros(len(x), dtype=np.float32)
+    scales = np.where(peak > 0, 127.0 / np.maximum(peak, 1e-12), 1.0).astype(np.float32)
+    quantized = np.round(x * scales[:, None]).astype(np.int8)
+    return quantized, scales
+
+
+def gallery_from_arrays(matrix: np.ndarray, ids: np.ndarray,
+                        metadata_by_id: Dict[int, Tuple[str, str]],
+                        quantize: bool = False) -> EmbeddingGallery:
+    """Build an EmbeddingGallery from row-aligned (N, D) templates and (N,) student ids.
+    
+    Rows are L2-normalized in place; ``metadata_by_id`` maps student id to
+    (name, roll_number). ``quantize`` adds an int8 copy for scoring.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    
+    student_ids, row_student = np.unique(np.asarray(ids, dtype=np.int64), return_inverse=True)
+    students = [metadata_by_id[int(student_id)] for student_id in student_ids]
+    gallery = EmbeddingGallery(matrix, row_student.reshape(-1), student_ids, students)
+    if quantize:
+        gallery = gallery._replace(**dict(zip(("quantized", "scales"), _quantize_int8(matrix))))
+    return gallery
+
+
+def build_gallery(known_embeddings: List[Tuple], quantize: bool = False) -> EmbeddingGallery:
+    """Stack (student_id, name, roll_number, embedding) rows into an EmbeddingGallery."""
+    if not known_embeddings:
+        return gallery_from_arrays(
+            np.empty((0, EMBEDDING_SIZE), dtype=np.float32), np.empty(0, dtype=np.int64), {}, quantize
+        )
+    
+    matrix = np.stack([np.asarray(row[3], dtype=np.float32) for row in known_embeddings])
+    ids = np.array([row[0] for row in known_embeddings], dtype=np.int64)
+    metadata_by_id = {}
+    for student_id, name, roll_number, _embedding in known_embeddings:
+        metadata_by_id.setdefault(student_id, (name, roll_number))
+    return gallery_from_arrays(matrix, ids, metadata_by_id, quantize)
+
+
+def gallery_similarities(gallery: EmbeddingGallery, embedding: np.ndarray) -> np.ndarray:
+    """Cosine similarity of ``embedding`` to every gallery row, in one matrix-vector product.
+    
+    Uses the int8 templates when the gallery is quantized.
+    """
+    query = np.asarray(embedding, dtype=np.float32)
+    query_norm = np.linalg.norm(query)
+    if query_norm > 0:
+        query = query / query_norm
+    if gallery.quantized is not None:
+        # int8 x int8 dot products accumulated in int32, then rescaled per row
+        q_query, q_scale = _quantize_int8(query)
+        dots = np.einsum("ij,j->i", gallery.quantized, q_query[0], dtype=np.int32)
+        similarities = dots / (gallery.scales * q_scale[0])
+    else:
+        similarities = gallery.matrix @ query
+    return np.clip(similarities, -1.0, 1.0)
+
+
 class FaceRecognitionEngine:
     """Enhanced face recognition processing engine with better error handling"""
     
@@ -48,6 +135,12 @@ class FaceRecognitionEngine:
         self.recognition_threshold = RECOGNITION_THRESHOLD
         self.recognition_margin = RECOGNITION_MARGIN
         self.allow_skip_detection_fallback = ALLOW_SKIP_DETECTION_FALLBACK
+        self.use_int8_gallery = RECOGNITION_INT8_GALLERY
+        
+        # Probe embeddings by image content, so the debug views re-examining a photo that
+        # recognition just processed reuse its forward pass (only successes are kept, so a
+        # transient model error does not pin a failure for the photo)
+        self._probe_embeddings = TTLCache(maxsize=16, ttl=120)
         
         # Try to initialize models
         self._initialize_models()
@@ -91,17 +184,18 @@ class FaceRecognitionEngine:
                     return None  # Strict mode
                 # Continue anyway in non-debug mode
             
-            # Try multiple approaches for embedding generation
-            embedding = self._try_multiple_detection_approaches(image, debug_mode)
+            # Try multiple approaches for embedding generation (memoized per image content)
+            key = _image_key(image)
+            embedding = self._probe_embeddings.get(key)
+            if embedding is None:
+                embedding = self._try_multiple_detection_approaches(image, debug_mode)
+                if embedding is not None:
+                    embedding = self._finalize_embedding(embedding)
+                    self._probe_embeddings.set(key, embedding)
             
             if embedding is not None:
-                # Validate and resize embedding
-                embedding = resize_embedding_to_512(embedding)
-                
-                # Normalize embedding
-                embedding_norm = np.linalg.norm(embedding)
-                if embedding_norm > 0:
-                    embedding = embedding / embedding_norm
+                # Callers may keep or modify the result; the cached copy must stay intact
+                embedding = embedding.copy()
                 
                 if debug_mode:
                     logger.info(f"Successfully generated embedding of size {embedding.shape[0]}")
@@ -118,6 +212,16 @@ class FaceRecognitionEngine:
                 logger.error(traceback.format_exc())
             return None
     
+    def _finalize_embedding(self, embedding: np.ndarray) -> np.ndarray:
+        """Resize a raw model embedding to EMBEDDING_SIZE and L2-normalize it"""
+        embedding = resize_embedding_to_512(embedding)
+        
+        embedding_norm = np.linalg.norm(embedding)
+        if embedding_norm > 0:
+            embedding = embedding / embedding_norm
+        
+        return embedding
+    
     def _try_multiple_detection_approaches(self, image, debug_mode: bool = False) -> Optional[np.ndarray]:
         """Try multiple detection backends and approaches"""
         
@@ -269,13 +373,17 @@ class FaceRecognitionEngine:
     def recognize_face(
         self,
         input_image,
-        known_embeddings: List[Tuple],
+        known_embeddings: Union[EmbeddingGallery, List[Tuple], "Future[EmbeddingGallery]"],
         debug_mode: bool = False,
     ) -> Tuple[bool, Optional[dict], float, Dict[str, Any]]:
         """
         Recognize face using per-student max similarity over gallery embeddings, then:
         - require similarity >= RECOGNITION_THRESHOLD
         - if 2+ students: require (best - second_best) >= RECOGNITION_MARGIN
+        
+        ``known_embeddings`` is either a prebuilt EmbeddingGallery, a list of
+        (student_id, name, roll_number, embedding) rows, or a Future resolving
+        to a gallery (awaited only once the probe embedding has been computed).
         """
         meta: Dict[str, Any] = {
             "reason": "error",
@@ -286,36 +394,31 @@ class FaceRecognitionEngine:
         }
         try:
             input_embedding = self.generate_embedding(input_image, debug_mode)
+            gallery = known_embeddings
+            if isinstance(gallery, Future):
+                gallery = gallery.result()
             if input_embedding is None:
                 meta["reason"] = "embedding_failed"
                 meta["detail"] = "Could not extract a face embedding. Check lighting and face visibility."
                 return False, None, 0.0, meta
 
-            # Group embeddings by student; score each student by max similarity to any template
-            by_student = defaultdict(list)
-            for student_id, name, roll_number, known_embedding in known_embeddings:
-                by_student[student_id].append((name, roll_number, known_embedding))
-
-            student_scores: List[Tuple[float, int, str, str]] = []
-            for student_id, rows in by_student.items():
-                name0, roll0 = rows[0][0], rows[0][1]
-                best_for_student = 0.0
-                for _n, _r, known_embedding in rows:
-                    try:
-                        sim = self.cosine_similarity(input_embedding, known_embedding)
-                        if sim > best_for_student:
-                            best_for_student = sim
-                    except Exception as e:
-                        logger.warning("Error comparing with student %s: %s", name0, e)
-                student_scores.append((best_for_student, student_id, name0, roll0))
-
-            student_scores.sort(key=lambda x: -x[0])
-            if not student_scores:
+            if not isinstance(gallery, EmbeddingGallery):
+                gallery = build_gallery(gallery, quantize=self.use_int8_gallery)
+
+            # Score each student by max similarity to any of their templates (one GEMV)
+            similarities = gallery_similarities(gallery, input_embedding)
+            best_per_student = np.zeros(len(gallery.student_ids), dtype=np.float32)
+            np.maximum.at(best_per_student, gallery.row_student, similarities)
+
+            if not len(gallery.student_ids):
                 meta["reason"] = "no_gallery"
                 return False, None, 0.0, meta
 
-            best_sim, best_sid, best_name, best_roll = student_scores[0]
-            second_sim = student_scores[1][0] if len(student_scores) > 1 else 0.0
+            top = np.argsort(-best_per_student, kind="stable")[:2]
+            best_sim = float(best_per_student[top[0]])
+            second_sim = float(best_per_student[top[1]]) if len(top) > 1 else 0.0
+            best_sid = int(gallery.student_ids[top[0]])
+            best_name, best_roll = gallery.students[top[0]]
             meta["best_similarity"] = float(best_sim)
             meta["second_similarity"] = float(second_sim)
 
@@ -324,7 +427,7 @@ class FaceRecognitionEngine:
                 logger.info("No match above threshold. Best similarity: %.3f", best_sim)
                 return False, None, best_sim, meta
 
-            if len(student_scores) > 1 and (best_sim - second_sim) < self.recognition_margin:
+            if len(top) > 1 and (best_sim - second_sim) < self.recognition_margin:
                 meta["reason"] = "ambiguous"
                 logger.info(
                     "Ambiguous match: best=%.3f second=%.3f margin_required=%.3f",
@@ -350,22 +453,84 @@ class FaceRecognitionEngine:
             meta["detail"] = str(e)
             return False, None, 0.0, meta
     
-    def batch_generate_embeddings(self, images: List[np.ndarray], debug_mode: bool = False) -> List[Optional[np.ndarray]]:
-        """Generate embeddings for multiple images with progress tracking"""
-        embeddings = []
-        successful_count = 0
+    def _represent_batch(self, rgb_images: List[np.ndarray], detector_backend: Optional[str] = None,
+                         enforce_detection: bool = True) -> Optional[List]:
+        """Run one DeepFace forward pass over several images.
+        
+        Returns one result list per image, or None when the installed DeepFace
+        cannot batch or the batch fails (e.g. one image has no detectable face).
+        """
+        try:
+            results = _deepface().represent(
+                img_path=rgb_images,
+                model_name=self.model_name,
+                detector_backend=detector_backend or self.detector_backend,
+                enforce_detection=enforce_detection
+            )
+        except Exception as e:
+            logger.info(f"Batched embedding unavailable, falling back to per-image: {e}")
+            return None
+        
+        if (isinstance(results, list) and len(results) == len(rgb_images)
+                and all(isinstance(r, list) for r in results)):
+            return results
+        return None
+    
+    def generate_embeddings_batch(self, images: List[np.ndarray], debug_mode: bool = False) -> List[Optional[np.ndarray]]:
+        """Generate embeddings for multiple images with a single batched forward pass.
+        
+        Images the batch could not embed fall back to generate_embedding's
+        multi-approach path; debug mode always processes images one by one.
+        """
+        embeddings: List[Optional[np.ndarray]] = [None] * len(images)
+        
+        if not debug_mode and len(images) > 1:
+            usable = [i for i, image in enumerate(images) if image is not None and len(image.shape) == 3]
+            results = self._represent_batch([ensure_rgb(images[i]) for i in usable]) if usable else None
+            if results is not None:
+                for i, result in zip(usable, results):
+                    embedding = self._extract_embedding_from_result(result)
+                    if embedding is not None:
+                        embeddings[i] = self._finalize_embedding(embedding)
         
         for i, image in enumerate(images):
-            logger.info(f"Processing image {i+1}/{len(images)}")
-            embedding = self.generate_embedding(image, debug_mode)
-            
-            if embedding is not None:
-                successful_count += 1
-            
-            embeddings.append(embedding)
+            if embeddings[i] is None:
+                embeddings[i] = self.generate_embedding(image, debug_mode)
         
+        successful_count = sum(embedding is not None for embedding in embeddings)
         logger.info(f"Successfully generated {successful_count}/{len(images)} embeddings")
         return embeddings
+
+    def batch_generate_embeddings(self, images: List[np.ndarray], debug_mode: bool = False) -> List[Optional[np.ndarray]]:
+        """Generate embeddings for multiple images (kept for existing callers; see generate_embeddings_batch)"""
+        return self.generate_embeddings_batch(images, debug_mode)
+
+    def generate_embeddings_without_detection(self, images: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+        """Embed whole images (e.g. face crops) with detection skipped, batched into one forward pass.
+        
+        Falls back to one DeepFace call per image when batching is unavailable.
+        """
+        rgb_images = [ensure_rgb(image) for image in images]
+        results = self._represent_batch(rgb_images, detector_backend='skip', enforce_detection=False)
+        if results is None:
+            results = []
+            for rgb_image in rgb_images:
+                try:
+                    results.append(_deepface().represent(
+                        img_path=rgb_image,
+                        model_name=self.model_name,
+                        detector_backend='skip',
+                        enforce_detection=False
+                    ))
+                except Exception as e:
+                    logger.warning(f"Skip-detection embedding failed: {e}")
+                    results.append(None)
+        
+        embeddings: List[Optional[np.ndarray]] = []
+        for result in results:
+            embedding = self._extract_embedding_from_result(result) if result is not None else None
+            embeddings.append(self._finalize_embedding(embedding) if embedding is not None else None)
+        return embeddings
     
     def validate_embedding_quality(self, embedding: np.ndarray) -> Tuple[bool, str]:
         """Validate the quality of generated embedding"""
@@ -441,3 +606,17 @@ class FaceRecognitionEngine:
             debug_info['error'] = str(e)
         
         return debug_info
+
+
+_face_engine: Optional[FaceRecognitionEngine] = None
+_face_engine_lock = threading.Lock()
+
+
+def get_face_engine() -> FaceRecognitionEngine:
+    """Process-wide FaceRecognitionEngine, created (and its model warmed up) on first use."""
+    global _face_engine
+    if _face_engine is None:
+        with _face_engine_lock:
+            if _face_engine is None:
+                _face_engine = FaceRecognitionEngine()
+    return _face_engine
@@ -2,37 +2,156 @@
 Analytics service for attendance data - Fixed version
 Provides meaningful insights and reports with correct percentage calculations
 """
+import heapq
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
+from config.settings import ANALYTICS_DEFAULT_DAYS
 from database.connection import get_db_connection
+from utils.cache import STUDENTS_TAG, analytics_cache, attendance_date_tag
 
 logger = logging.getLogger(__name__)
 
+# Indexed by SQLite's strftime('%w') weekday number (0 = Sunday)
+DAY_NAMES = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+
+# Arrivals after 09:00 count as late (attendance.time_in_sod, seconds since midnight)
+LATE_THRESHOLD_SOD = 9 * 3600
+
+# Student performance bands: (minimum attendance %, category, status)
+PERFORMANCE_BANDS = (
+    (90, 'Excellent', '🟢'),
+    (75, 'Good', '🟡'),
+    (60, 'Average', '🟠'),
+)
+PERFORMANCE_FALLBACK = ('Poor', '🔴')
+
+
+def _performance_case(column: int) -> str:
+    """CASE expression mapping p.attendance_percentage onto PERFORMANCE_BANDS"""
+    whens = ' '.join(
+        f"WHEN p.attendance_percentage >= {band[0]} THEN '{band[column]}'"
+        for band in PERFORMANCE_BANDS
+    )
+    return f"CASE {whens} ELSE '{PERFORMANCE_FALLBACK[column - 1]}' END"
+
+
+_CATEGORY_SQL = _performance_case(1)
+_STATUS_SQL = _performance_case(2)
+
+# Cap on alerts returned by get_attendance_alerts (low attendance first)
+MAX_ALERTS = 15
+
+# Course rating bands: lower bounds of 55/70/85% average daily attendance
+COURSE_RATING_BINS = [float('-inf'), 55, 70, 85, float('inf')]
+COURSE_RATING_COLORS = {
+    'Needs Attention': '#ef4444',
+    'Average': '#f59e0b',
+    'Good': '#3b82f6',
+    'Excellent': '#10b981',
+}
+
+
+def _compute_trend(arr: np.ndarray, window: int) -> Tuple[float, float, float]:
+    """Return (recent_avg, previous_avg, change) over trailing windows of daily counts.
+
+    Falls back to the recent window as the baseline when there is not enough
+    history for a full previous window.
+    """
+    recent = float(arr[-window:].mean())
+    prev = float(arr[-2 * window:-window].mean()) if arr.size >= 2 * window else recent
+    return recent, prev, recent - prev
+
+
+# Rows listed under "Top Performers" on the dashboard
+TOP_PERFORMERS = 10
+
+
+def summarize_student_performance(performance: List[Dict]) -> Dict:
+    """Dashboard scalars for a get_student_performance_analysis result, in one pass over the rows"""
+    categories = Counter(p['category'] for p in performance)
+    return {
+        # Most common first, like pandas value_counts
+        'category_counts': dict(categories.most_common()),
+        # heapq.nlargest is stable, so ties keep query order (as DataFrame.nlargest does)
+        'top_performers': heapq.nlargest(TOP_PERFORMERS, performance, key=lambda p: p['attendance_percentage']),
+        'excellent_count': categories['Excellent'],
+        'poor_count': categories[PERFORMANCE_FALLBACK[0]],
+        'avg_attendance': (
+            sum(p['attendance_percentage'] for p in performance) / len(performance) if performance else 0.0
+        ),
+    }
+
+
 class AnalyticsService:
     """Advanced analytics for attendance system with fixed calculations"""
     
     def __init__(self):
         self.db_connection = get_db_connection
     
-    def get_comprehensive_analytics(self, days_back: int = 30) -> Dict:
-        """Get comprehensive analytics for the dashboard"""
+    def _count_working_days(self, cursor, start_date: date, end_date: date) -> int:
+        """Number of distinct dates with attendance records in the window (cached)"""
+        def _query() -> int:
+            cursor.execute("""
+                SELECT COUNT(DISTINCT date) as working_days
+                FROM attendance
+                WHERE date BETWEEN ? AND ?
+            """, (start_date, end_date))
+            return cursor.fetchone()['working_days'] or 0
+        
+        # Attendance is only ever marked for today, so only windows covering today can go stale early
+        today = date.today()
+        tags = (attendance_date_tag(today),) if start_date <= today <= end_date else ()
+        key = ('working_days', str(start_date), str(end_date))
+        return analytics_cache.get_or_set(key, _query, tags)
+    
+    def get_comprehensive_analytics(self, days_back: int = ANALYTICS_DEFAULT_DAYS) -> Dict:
+        """Get comprehensive analytics for the dashboard, memoized per (day, window)
+        until today's attendance or the student set changes"""
+        key = self._comprehensive_key(days_back)
+        analytics = analytics_cache.get(key)
+        if analytics is None:
+            analytics = self._build_comprehensive_analytics(days_back)
+            # A failed build returns {}; leave it uncached so the next rerun retries
+            if analytics:
+                analytics_cache.set(key, analytics, (attendance_date_tag(date.today()), STUDENTS_TAG))
+        return analytics
+    
+    def refresh_comprehensive_analytics(self, days_back: int = ANALYTICS_DEFAULT_DAYS) -> None:
+        """Drop the memoized dashboard analytics for ``days_back`` so the next read recomputes"""
+        analytics_cache.pop(self._comprehensive_key(days_back))
+    
+    @staticmethod
+    def _comprehensive_key(days_back: int) -> Tuple:
+        return ('comprehensive_analytics', date.today().isoformat(), days_back)
+    
+    def _build_comprehensive_analytics(self, days_back: int) -> Dict:
+        """Compute every dashboard section concurrently ({} on failure)"""
         try:
             end_date = date.today()
             start_date = end_date - timedelta(days=days_back)
             
-            analytics = {
-                'overview': self.get_overview_stats(),
-                'daily_trends': self.get_daily_attendance_trends(start_date, end_date),
-                'student_performance': self.get_student_performance_analysis(start_date, end_date),
-                'course_analytics': self.get_course_wise_analytics(start_date, end_date),
-                'time_patterns': self.get_time_pattern_analysis(start_date, end_date),
-                'weekly_summary': self.get_weekly_summary(start_date, end_date),
-                'alerts': self.get_attendance_alerts(),
-                'predictions': self.get_trend_predictions(start_date, end_date)
+            # Each section opens its own connection, so they can run concurrently under WAL
+            tasks = {
+                'overview': (self.get_overview_stats,),
+                'daily_trends': (self.get_daily_attendance_trends, start_date, end_date),
+                'student_performance': (self.get_student_performance_analysis, start_date, end_date),
+                'course_analytics': (self.get_course_wise_analytics, start_date, end_date),
+                'time_patterns': (self.get_time_pattern_analysis, start_date, end_date),
+                'weekly_summary': (self.get_weekly_summary, start_date, end_date),
+                'alerts': (self.get_attendance_alerts,),
+                'predictions': (self.get_trend_predictions, start_date, end_date)
             }
             
+            with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+                futures = {key: executor.submit(*task) for key, task in tasks.items()}
+                analytics = {key: future.result() for key, future in futures.items()}
+            
+            analytics['student_performance_summary'] = summarize_student_performance(analytics['student_performance'])
             return analytics
             
         except Exception as e:
@@ -45,34 +164,34 @@ class AnalyticsService:
             with self.db_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Total students
-                cursor.execute("SELECT COUNT(*) FROM students WHERE is_active = 1")
-                total_students = cursor.fetchone()[0]
-                
-                # Students with attendance today
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT student_id) 
-                    FROM attendance 
-                    WHERE date = ? AND time_in IS NOT NULL
-                """, (date.today(),))
-                present_today = cursor.fetchone()[0]
-                
-                # Total attendance records
-                cursor.execute("SELECT COUNT(*) FROM attendance")
-                total_records = cursor.fetchone()[0]
-                
-                # Average daily attendance (last 30 days)
+                # Overview scalars in a single round-trip
                 cursor.execute("""
-                    SELECT AVG(daily_count) FROM (
-                        SELECT COUNT(DISTINCT student_id) as daily_count
-                        FROM attendance 
-                        WHERE date >= ? AND time_in IS NOT NULL
-                        GROUP BY date
-                    )
-                """, (date.today() - timedelta(days=30),))
-                
-                avg_daily_result = cursor.fetchone()
-                avg_daily = avg_daily_result[0] if avg_daily_result and avg_daily_result[0] else 0
+                    WITH
+                        s AS (SELECT COUNT(*) AS c FROM students WHERE is_active = 1),
+                        t AS (
+                            SELECT COUNT(DISTINCT student_id) AS c
+                            FROM attendance
+                            WHERE date = ? AND time_in IS NOT NULL
+                        ),
+                        r AS (SELECT COUNT(*) AS c FROM attendance),
+                        d AS (
+                            SELECT AVG(daily_count) AS a FROM (
+                                SELECT COUNT(DISTINCT student_id) AS daily_count
+                                FROM attendance
+                                WHERE date >= ? AND time_in IS NOT NULL
+                                GROUP BY date
+                            )
+                        )
+                    SELECT s.c AS total_students, t.c AS present_today,
+                           r.c AS total_records, d.a AS avg_daily
+                    FROM s, t, r, d
+                """, (date.today(), date.today() - timedelta(days=30)))
+                
+                row = cursor.fetchone()
+                total_students = row['total_students']
+                present_today = row['present_today']
+                total_records = row['total_records']
+                avg_daily = row['avg_daily'] or 0
                 
                 # Attendance rate calculation
                 attendance_rate = (present_today / total_students * 100) if total_students > 0 else 0
@@ -98,9 +217,15 @@ class AnalyticsService:
             with self.db_connection() as conn:
                 cursor = conn.cursor()
                 
+                # Get total students for percentage calculation
+                cursor.execute("SELECT COUNT(*) FROM students WHERE is_active = 1")
+                total_students_result = cursor.fetchone()
+                total_students = total_students_result[0] if total_students_result else 0
+                
                 cursor.execute("""
                     SELECT 
                         date,
+                        strftime('%w', date) as weekday,
                         COUNT(DISTINCT student_id) as present_count,
                         COUNT(DISTINCT CASE WHEN time_in IS NOT NULL THEN student_id END) as checked_in,
                         COUNT(DISTINCT CASE WHEN time_out IS NOT NULL THEN student_id END) as checked_out
@@ -110,15 +235,8 @@ class AnalyticsService:
                     ORDER BY date
                 """, (start_date, end_date))
                 
-                results = cursor.fetchall()
-                
-                # Get total students for percentage calculation
-                cursor.execute("SELECT COUNT(*) FROM students WHERE is_active = 1")
-                total_students_result = cursor.fetchone()
-                total_students = total_students_result[0] if total_students_result else 0
-                
                 trends = []
-                for row in results:
+                for row in cursor:
                     present_count = row['present_count'] or 0
                     checked_in = row['checked_in'] or 0
                     checked_out = row['checked_out'] or 0
@@ -126,12 +244,8 @@ class AnalyticsService:
                     # Fixed percentage calculation
                     attendance_rate = (present_count / total_students * 100) if total_students > 0 else 0
                     
-                    # Parse date to get day name
-                    try:
-                        date_obj = datetime.strptime(row['date'], '%Y-%m-%d')
-                        day_name = date_obj.strftime('%A')
-                    except:
-                        day_name = 'Unknown'
+                    weekday = row['weekday']
+                    day_name = DAY_NAMES[int(weekday)] if weekday is not None else 'Unknown'
                     
                     trends.append({
                         'date': row['date'],
@@ -159,61 +273,47 @@ class AnalyticsService:
                 total_days = (end_date - start_date).days + 1
                 
                 # Count actual days with attendance records (more accurate)
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT date) as working_days
-                    FROM attendance
-                    WHERE date BETWEEN ? AND ?
-                """, (start_date, end_date))
-                
-                working_days_result = cursor.fetchone()
-                working_days = working_days_result['working_days'] if working_days_result and working_days_result['working_days'] else total_days
+                working_days = self._count_working_days(cursor, start_date, end_date) or total_days
                 
                 # If no attendance records exist, use business days calculation
                 if working_days == 0:
                     working_days = sum(1 for i in range(total_days) 
                                      if (start_date + timedelta(days=i)).weekday() < 5)
                 
-                cursor.execute("""
+                # Percentage and category/status are computed in SQL so rows arrive pre-bucketed
+                cursor.execute(f"""
                     SELECT 
-                        s.id,
-                        s.name,
-                        s.roll_number,
-                        s.course,
-                        COUNT(DISTINCT a.date) as days_attended,
-                        COUNT(DISTINCT CASE WHEN a.time_in IS NOT NULL THEN a.date END) as days_checked_in,
-                        COUNT(DISTINCT CASE WHEN a.time_out IS NOT NULL THEN a.date END) as days_checked_out,
-                        AVG(
-                            CASE WHEN a.time_in IS NOT NULL THEN
-                                CAST(strftime('%H', a.time_in) AS INTEGER) * 60 + 
-                                CAST(strftime('%M', a.time_in) AS INTEGER)
-                            END
-                        ) as avg_arrival_minutes,
-                        COUNT(DISTINCT CASE 
-                            WHEN a.time_in IS NOT NULL AND 
-                                 CAST(strftime('%H', a.time_in) AS INTEGER) * 60 + 
-                                 CAST(strftime('%M', a.time_in) AS INTEGER) > 540 -- 9:00 AM
-                            THEN a.date 
-                        END) as late_days
-                    FROM students s
-                    LEFT JOIN attendance a ON s.id = a.student_id 
-                        AND a.date BETWEEN ? AND ?
-                    WHERE s.is_active = 1
-                    GROUP BY s.id, s.name, s.roll_number, s.course
-                    ORDER BY days_attended DESC
-                """, (start_date, end_date))
-                
-                results = cursor.fetchall()
+                        p.*,
+                        {_CATEGORY_SQL} as category,
+                        {_STATUS_SQL} as status
+                    FROM (
+                        SELECT 
+                            s.id,
+                            s.name,
+                            s.roll_number,
+                            s.course,
+                            COUNT(DISTINCT a.date) as days_attended,
+                            COALESCE(COUNT(DISTINCT a.date) * 100.0 / NULLIF(?, 0), 0) as attendance_percentage,
+                            COUNT(DISTINCT CASE WHEN a.time_in IS NOT NULL THEN a.date END) as days_checked_in,
+                            COUNT(DISTINCT CASE WHEN a.time_out IS NOT NULL THEN a.date END) as days_checked_out,
+                            AVG(a.time_in_sod) / 60.0 as avg_arrival_minutes,
+                            COUNT(DISTINCT CASE WHEN a.time_in_sod > ? THEN a.date END) as late_days
+                        FROM students s
+                        LEFT JOIN attendance a ON s.id = a.student_id 
+                            AND a.date BETWEEN ? AND ?
+                        WHERE s.is_active = 1
+                        GROUP BY s.id, s.name, s.roll_number, s.course
+                    ) p
+                    ORDER BY p.days_attended DESC
+                """, (working_days, LATE_THRESHOLD_SOD, start_date, end_date))
                 
                 performance = []
-                for row in results:
+                for row in cursor:
                     days_attended = row['days_attended'] or 0
                     days_checked_in = row['days_checked_in'] or 0
                     days_checked_out = row['days_checked_out'] or 0
                     late_days = row['late_days'] or 0
                     
-                    # Fixed attendance percentage calculation
-                    attendance_percentage = (days_attended / working_days * 100) if working_days > 0 else 0
-                    
                     # Convert average arrival minutes to time
                     avg_arrival = "N/A"
                     if row['avg_arrival_minutes'] is not None:
@@ -222,20 +322,6 @@ class AnalyticsService:
                         minutes = total_minutes % 60
                         avg_arrival = f"{hours:02d}:{minutes:02d}"
                     
-                    # Fixed performance category based on corrected percentage
-                    if attendance_percentage >= 90:
-                        category = "Excellent"
-                        status = "🟢"
-                    elif attendance_percentage >= 75:
-                        category = "Good"
-                        status = "🟡"
-                    elif attendance_percentage >= 60:
-                        category = "Average"
-                        status = "🟠"
-                    else:
-                        category = "Poor"
-                        status = "🔴"
-                    
                     # Fixed punctuality rate calculation
                     punctuality_rate = ((days_attended - late_days) / max(days_attended, 1) * 100) if days_attended > 0 else 100
                     
@@ -246,9 +332,9 @@ class AnalyticsService:
                         'course': row['course'],
                         'days_attended': days_attended,
                         'working_days': working_days,
-                        'attendance_percentage': round(attendance_percentage, 1),
-                        'category': category,
-                        'status': status,
+                        'attendance_percentage': round(row['attendance_percentage'], 1),
+                        'category': row['category'],
+                        'status': row['status'],
                         'avg_arrival_time': avg_arrival,
                         'late_days': late_days,
                         'punctuality_rate': round(punctuality_rate, 1),
@@ -266,81 +352,65 @@ class AnalyticsService:
         """Get course-wise attendance analytics with fixed calculations"""
         try:
             with self.db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Get working days for the period
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT date) as working_days
-                    FROM attendance
-                    WHERE date BETWEEN ? AND ?
-                """, (start_date, end_date))
-                
-                working_days_result = cursor.fetchone()
-                working_days = working_days_result['working_days'] if working_days_result else (end_date - start_date).days + 1
-                
-                cursor.execute("""
+                courses = pd.read_sql_query("""
                     SELECT 
                         s.course,
                         COUNT(DISTINCT s.id) as total_students,
                         COUNT(DISTINCT a.student_id) as students_with_attendance,
-                        COUNT(DISTINCT a.date) as active_days,
-                        COUNT(DISTINCT CASE WHEN a.time_in IS NOT NULL THEN a.student_id || '_' || a.date END) as total_attendance_instances,
-                        AVG(daily_stats.daily_count) as avg_daily_attendance
+                        COUNT(DISTINCT a.date) as active_days
                     FROM students s
                     LEFT JOIN attendance a ON s.id = a.student_id 
                         AND a.date BETWEEN ? AND ?
-                    LEFT JOIN (
-                        SELECT 
-                            s2.course,
-                            a2.date,
-                            COUNT(DISTINCT a2.student_id) as daily_count
-                        FROM students s2
-                        JOIN attendance a2 ON s2.id = a2.student_id
-                        WHERE a2.date BETWEEN ? AND ? AND a2.time_in IS NOT NULL
-                        GROUP BY s2.course, a2.date
-                    ) daily_stats ON s.course = daily_stats.course
                     WHERE s.is_active = 1
                     GROUP BY s.course
-                    HAVING total_students > 0
-                    ORDER BY total_students DESC
-                """, (start_date, end_date, start_date, end_date))
-                
-                results = cursor.fetchall()
-                
-                course_analytics = []
-                for row in results:
-                    total_students = row['total_students'] or 0
-                    avg_attendance = row['avg_daily_attendance'] or 0
-                    
-                    # Fixed attendance rate calculation
-                    attendance_rate = (avg_attendance / total_students * 100) if total_students > 0 and avg_attendance > 0 else 0
-                    
-                    # Performance rating based on corrected rate
-                    if attendance_rate >= 85:
-                        rating = "Excellent"
-                        color = "#10b981"
-                    elif attendance_rate >= 70:
-                        rating = "Good"
-                        color = "#3b82f6"
-                    elif attendance_rate >= 55:
-                        rating = "Average"
-                        color = "#f59e0b"
-                    else:
-                        rating = "Needs Attention"
-                        color = "#ef4444"
-                    
-                    course_analytics.append({
-                        'course': row['course'] or 'Unknown',
-                        'total_students': total_students,
-                        'avg_daily_attendance': round(avg_attendance, 1),
-                        'attendance_rate': round(attendance_rate, 1),
-                        'rating': rating,
-                        'color': color,
-                        'active_days': row['active_days'] or 0,
-                        'students_with_attendance': row['students_with_attendance'] or 0
-                    })
+                """, conn, params=(start_date, end_date))
                 
-                return course_analytics
+                daily = pd.read_sql_query("""
+                    SELECT s.course, a.date, COUNT(DISTINCT a.student_id) as daily_count
+                    FROM students s
+                    JOIN attendance a ON s.id = a.student_id
+                    WHERE a.date BETWEEN ? AND ? AND a.time_in IS NOT NULL
+                    GROUP BY s.course, a.date
+                """, conn, params=(start_date, end_date))
+            
+            courses = courses[courses['total_students'] > 0]
+            if courses.empty:
+                return []
+            
+            courses['course'] = courses['course'].fillna('Unknown')
+            daily['course'] = daily['course'].fillna('Unknown')
+            avg_daily = daily.groupby('course')['daily_count'].mean().rename('avg_daily_attendance')
+            
+            df = courses.merge(avg_daily, how='left', left_on='course', right_index=True)
+            df['avg_daily_attendance'] = df['avg_daily_attendance'].fillna(0.0)
+            
+            # Fixed attendance rate calculation
+            df['attendance_rate'] = df['avg_daily_attendance'] / df['total_students'] * 100
+            
+            # Performance rating based on corrected rate
+            df['rating'] = pd.cut(
+                df['attendance_rate'],
+                bins=COURSE_RATING_BINS,
+                labels=list(COURSE_RATING_COLORS),
+                right=False,
+            ).astype(str)
+            df['color'] = df['rating'].map(COURSE_RATING_COLORS)
+            
+            df = df.sort_values('total_students', ascending=False, kind='stable')
+            
+            return [
+                {
+                    'course': row.course,
+                    'total_students': int(row.total_students),
+                    'avg_daily_attendance': round(float(row.avg_daily_attendance), 1),
+                    'attendance_rate': round(float(row.attendance_rate), 1),
+                    'rating': row.rating,
+                    'color': row.color,
+                    'active_days': int(row.active_days),
+                    'students_with_attendance': int(row.students_with_attendance)
+                }
+                for row in df.itertuples(index=False)
+            ]
                 
         except Exception as e:
             logger.error(f"Error getting course analytics: {e}")
@@ -350,66 +420,42 @@ class AnalyticsService:
         """Analyze attendance time patterns"""
         try:
             with self.db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Hourly check-in patterns
-                cursor.execute("""
-                    SELECT 
-                        strftime('%H', time_in) as hour,
-                        COUNT(*) as check_ins
-                    FROM attendance
-                    WHERE date BETWEEN ? AND ? AND time_in IS NOT NULL
-                    GROUP BY strftime('%H', time_in)
-                    ORDER BY hour
-                """, (start_date, end_date))
-                
-                hourly_checkins = []
-                for row in cursor.fetchall():
-                    hour = row['hour']
-                    if hour:  # Only add valid hours
-                        hourly_checkins.append({
-                            'hour': f"{hour}:00",
-                            'count': row['check_ins']
-                        })
-                
-                # Day of week patterns
-                cursor.execute("""
-                    SELECT 
-                        CASE strftime('%w', date)
-                            WHEN '0' THEN 'Sunday'
-                            WHEN '1' THEN 'Monday'
-                            WHEN '2' THEN 'Tuesday'
-                            WHEN '3' THEN 'Wednesday'
-                            WHEN '4' THEN 'Thursday'
-                            WHEN '5' THEN 'Friday'
-                            WHEN '6' THEN 'Saturday'
-                        END as day_name,
-                        COUNT(DISTINCT student_id) as attendance_count
+                df = pd.read_sql_query("""
+                    SELECT student_id, date, time_in
                     FROM attendance
                     WHERE date BETWEEN ? AND ? AND time_in IS NOT NULL
-                    GROUP BY strftime('%w', date)
-                    ORDER BY strftime('%w', date)
-                """, (start_date, end_date))
-                
-                weekly_patterns = []
-                for row in cursor.fetchall():
-                    if row['day_name']:  # Only add valid day names
-                        weekly_patterns.append({
-                            'day': row['day_name'],
-                            'count': row['attendance_count'] or 0
-                        })
-                
-                # Peak hours analysis
-                peak_hour = "N/A"
-                if hourly_checkins:
-                    peak_hour = max(hourly_checkins, key=lambda x: x['count'])['hour']
-                
-                return {
-                    'hourly_checkins': hourly_checkins,
-                    'weekly_patterns': weekly_patterns,
-                    'peak_hour': peak_hour,
-                    'total_checkins': sum(h['count'] for h in hourly_checkins)
-                }
+                """, conn, params=(start_date, end_date))
+            
+            time_in = pd.to_datetime(df['time_in'], format='ISO8601', errors='coerce')
+            day = pd.to_datetime(df['date'], format='ISO8601', errors='coerce')
+            
+            # Hourly check-in patterns
+            hourly = np.bincount(time_in.dropna().dt.hour.to_numpy(dtype=np.int64), minlength=24)
+            hourly_checkins = [
+                {'hour': f"{hour:02d}:00", 'count': int(hourly[hour])}
+                for hour in np.flatnonzero(hourly)
+            ]
+            
+            # Day of week patterns (distinct students per weekday, Sunday first)
+            weekdays = pd.DataFrame({
+                'student_id': df['student_id'],
+                'dow': (day.dt.dayofweek + 1) % 7,
+            }).dropna().drop_duplicates()
+            dow = np.bincount(weekdays['dow'].to_numpy(dtype=np.int64), minlength=7)
+            weekly_patterns = [
+                {'day': DAY_NAMES[d], 'count': int(dow[d])}
+                for d in np.flatnonzero(dow)
+            ]
+            
+            # Peak hours analysis
+            peak_hour = f"{int(hourly.argmax()):02d}:00" if hourly_checkins else "N/A"
+            
+            return {
+                'hourly_checkins': hourly_checkins,
+                'weekly_patterns': weekly_patterns,
+                'peak_hour': peak_hour,
+                'total_checkins': int(hourly.sum())
+            }
                 
         except Exception as e:
             logger.error(f"Error analyzing time patterns: {e}")
@@ -426,25 +472,18 @@ class AnalyticsService:
                 last_week_start = this_week_start - timedelta(days=7)
                 last_week_end = this_week_start - timedelta(days=1)
                 
-                # This week attendance
+                # This week and last week attendance in one pass
                 cursor.execute("""
-                    SELECT COUNT(DISTINCT student_id) as attendance
+                    SELECT
+                        COUNT(DISTINCT CASE WHEN date >= ? THEN student_id END) as this_week,
+                        COUNT(DISTINCT CASE WHEN date BETWEEN ? AND ? THEN student_id END) as last_week
                     FROM attendance
                     WHERE date >= ? AND time_in IS NOT NULL
-                """, (this_week_start,))
+                """, (this_week_start, last_week_start, last_week_end, last_week_start))
                 
-                this_week_result = cursor.fetchone()
-                this_week = this_week_result['attendance'] if this_week_result else 0
-                
-                # Last week attendance
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT student_id) as attendance
-                    FROM attendance
-                    WHERE date BETWEEN ? AND ? AND time_in IS NOT NULL
-                """, (last_week_start, last_week_end))
-                
-                last_week_result = cursor.fetchone()
-                last_week = last_week_result['attendance'] if last_week_result else 0
+                row = cursor.fetchone()
+                this_week = row['this_week'] if row else 0
+                last_week = row['last_week'] if row else 0
                 
                 # Calculate change
                 if last_week > 0:
@@ -466,25 +505,16 @@ class AnalyticsService:
     def get_attendance_alerts(self) -> List[Dict]:
         """Generate attendance alerts and warnings"""
         try:
-            alerts = []
-            
             with self.db_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Get working days in last 30 days
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT date) as working_days
-                    FROM attendance
-                    WHERE date >= ?
-                """, (date.today() - timedelta(days=30),))
-                
-                working_days_result = cursor.fetchone()
-                working_days = working_days_result['working_days'] if working_days_result else 22  # Default ~22 working days per month
+                working_days = self._count_working_days(cursor, date.today() - timedelta(days=30), date.today())
                 
                 # Students with low attendance (< 60% in last 30 days)
                 threshold_days = int(working_days * 0.6)  # 60% of working days
                 
-                cursor.execute("""
+                low = pd.read_sql_query("""
                     SELECT 
                         s.name, s.roll_number, s.course,
                         COUNT(DISTINCT a.date) as days_attended
@@ -496,56 +526,46 @@ class AnalyticsService:
                     HAVING days_attended < ?
                     ORDER BY days_attended ASC
                     LIMIT 10
-                """, (date.today() - timedelta(days=30), threshold_days))
-                
-                low_attendance = cursor.fetchall()
-                for student in low_attendance:
-                    days_attended = student['days_attended'] or 0
-                    attendance_rate = (days_attended / working_days * 100) if working_days > 0 else 0
-                    
-                    alerts.append({
-                        'type': 'low_attendance',
-                        'severity': 'high' if attendance_rate < 40 else 'medium',
-                        'title': f'Low Attendance Alert',
-                        'message': f"{student['name']} ({student['roll_number']}) has {attendance_rate:.1f}% attendance ({days_attended}/{working_days} days)",
-                        'student': student['name'],
-                        'action': 'Contact student/parent',
-                        'attendance_rate': round(attendance_rate, 1)
-                    })
+                """, conn, params=(date.today() - timedelta(days=30), threshold_days))
                 
-                # Students absent for consecutive days
-                cursor.execute("""
-                    SELECT s.name, s.roll_number, s.course, MAX(a.date) as last_attendance
+                # Students absent for consecutive days (30 when never seen or unparsable)
+                absent = pd.read_sql_query("""
+                    SELECT s.name, s.roll_number, s.course,
+                        COALESCE(CAST(julianday(?) - julianday(MAX(a.date)) AS INTEGER), 30) as days_absent
                     FROM students s
                     LEFT JOIN attendance a ON s.id = a.student_id AND a.time_in IS NOT NULL
                     WHERE s.is_active = 1
                     GROUP BY s.id
-                    HAVING last_attendance < ? OR last_attendance IS NULL
-                """, (date.today() - timedelta(days=5),))
-                
-                absent_students = cursor.fetchall()
-                for student in absent_students:
-                    last_date = student['last_attendance']
-                    if last_date:
-                        try:
-                            last_attendance_date = datetime.strptime(last_date, '%Y-%m-%d').date()
-                            days_absent = (date.today() - last_attendance_date).days
-                        except:
-                            days_absent = 30  # Default if date parsing fails
-                    else:
-                        days_absent = 30  # No attendance record
-                    
-                    alerts.append({
-                        'type': 'consecutive_absence',
-                        'severity': 'high' if days_absent >= 7 else 'medium',
-                        'title': f'Consecutive Absence Alert',
-                        'message': f"{student['name']} absent for {days_absent} days",
-                        'student': student['name'],
-                        'action': 'Immediate follow-up required',
-                        'days_absent': days_absent
-                    })
-                
-                return alerts[:15]  # Limit to 15 alerts
+                    HAVING days_absent > 5
+                    LIMIT ?
+                """, conn, params=(date.today().isoformat(), MAX_ALERTS - len(low)))
+            
+            days_attended = low['days_attended'].fillna(0).astype(int)
+            rate = (days_attended / working_days * 100) if working_days > 0 else days_attended * 0.0
+            rate = rate.round(1)
+            low_alerts = pd.DataFrame({
+                'type': 'low_attendance',
+                'severity': np.where(rate < 40, 'high', 'medium'),
+                'title': 'Low Attendance Alert',
+                'message': low['name'] + ' (' + low['roll_number'] + ') has ' + rate.map('{:.1f}'.format)
+                           + '% attendance (' + days_attended.astype(str) + f'/{working_days} days)',
+                'student': low['name'],
+                'action': 'Contact student/parent',
+                'attendance_rate': rate,
+            }, index=low.index)
+            
+            days_absent = absent['days_absent'].astype(int)
+            absence_alerts = pd.DataFrame({
+                'type': 'consecutive_absence',
+                'severity': np.where(days_absent >= 7, 'high', 'medium'),
+                'title': 'Consecutive Absence Alert',
+                'message': absent['name'] + ' absent for ' + days_absent.astype(str) + ' days',
+                'student': absent['name'],
+                'action': 'Immediate follow-up required',
+                'days_absent': days_absent,
+            }, index=absent.index)
+            
+            return low_alerts.to_dict('records') + absence_alerts.to_dict('records')
                 
         except Exception as e:
             logger.error(f"Error generating alerts: {e}")
@@ -566,17 +586,13 @@ class AnalyticsService:
                     ORDER BY date
                 """, (start_date, end_date))
                 
-                daily_data = cursor.fetchall()
+                counts = np.fromiter((row['attendance'] for row in cursor), dtype=np.float64)
                 
-                if len(daily_data) < 7:
+                if counts.size < 7:
                     return {'trend': 'insufficient_data', 'message': 'Need more data for predictions'}
                 
                 # Simple moving average trend
-                recent_values = [d['attendance'] for d in daily_data[-7:]]
-                previous_values = [d['attendance'] for d in daily_data[-14:-7]] if len(daily_data) >= 14 else recent_values
-                
-                recent_avg = sum(recent_values) / len(recent_values)
-                previous_avg = sum(previous_values) / len(previous_values)
+                recent_avg, previous_avg, change = _compute_trend(counts, 7)
                 
                 trend_direction = 'increasing' if recent_avg > previous_avg else 'decreasing' if recent_avg < previous_avg else 'stable'
                 
@@ -584,7 +600,7 @@ class AnalyticsService:
                     'trend': trend_direction,
                     'recent_average': round(recent_avg, 1),
                     'previous_average': round(previous_avg, 1),
-                    'change': round(recent_avg - previous_avg, 1),
+                    'change': round(change, 1),
                     'prediction': f"Expected attendance: {round(recent_avg, 0)}±2 students"
                 }
                 
@@ -595,17 +611,15 @@ class AnalyticsService:
     def export_analytics_report(self, start_date: date, end_date: date) -> Dict:
         """Generate comprehensive analytics report for export"""
         try:
-            analytics = self.get_comprehensive_analytics((end_date - start_date).days)
-            
-            # Create export-friendly format
+            # Only the sections embedded in the report are computed
             report = {
                 'report_period': f"{start_date} to {end_date}",
                 'generated_on': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'summary': analytics.get('overview', {}),
-                'student_performance': analytics.get('student_performance', []),
-                'course_analytics': analytics.get('course_analytics', []),
-                'daily_trends': analytics.get('daily_trends', []),
-                'alerts': analytics.get('alerts', [])
+                'summary': self.get_overview_stats(),
+                'student_performance': self.get_student_performance_analysis(start_date, end_date),
+                'course_analytics': self.get_course_wise_analytics(start_date, end_date),
+                'daily_trends': self.get_daily_attendance_trends(start_date, end_date),
+                'alerts': self.get_attendance_alerts()
             }
             
             return report
@@ -5,11 +5,27 @@ Extracted from db.py attendance functions
 import logging
 from typing import List, Dict, Tuple, Optional, Any
 from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
 from database.attendance_repository import AttendanceRepository
 from services.student_service import StudentService
+from utils.cache import STUDENTS_TAG, analytics_cache, attendance_date_tag
 
 logger = logging.getLogger(__name__)
 
+# Attendance record field -> export column header, in export order
+EXPORT_COLUMNS = {
+    'date': 'Date',
+    'student_name': 'Student Name',
+    'roll_number': 'Roll Number',
+    'time_in': 'Time In',
+    'time_out': 'Time Out',
+    'status': 'Status',
+    'marked_by': 'Marked By',
+}
+
 class AttendanceService:
     """Business logic for attendance management"""
     
@@ -83,44 +99,53 @@ class AttendanceService:
         return self.attendance_repo.get_today_stats()
     
     def get_attendance_analytics(self, days: int = 30) -> Dict:
-        """Get attendance analytics"""
-        return self.attendance_repo.get_attendance_analytics(days)
+        """Get attendance analytics, memoized per (day, window) until today's attendance changes"""
+        today = date.today()
+        return analytics_cache.get_or_set(
+            ('attendance_analytics', today.isoformat(), days),
+            lambda: self.attendance_repo.get_attendance_analytics(days),
+            (attendance_date_tag(today), STUDENTS_TAG),
+        )
     
-    def get_student_attendance_report(self, student_id: int, days: int = 30) -> Dict:
-        """Get detailed attendance report for a specific student"""
+    def get_student_attendance_report(self, student_id: int, days: int = 30,
+                                      include_records: bool = False) -> Dict:
+        """Get detailed attendance report for a specific student
+        
+        Counts come from a single aggregate query; the raw attendance rows are
+        only fetched (under 'records') when include_records is True.
+        """
         try:
             # Get student info
             student = self.student_service.get_student_by_id(student_id)
             if not student:
                 return {}
             
-            # Get attendance records for the student
             start_date = date.today() - timedelta(days=days)
-            records = self.attendance_repo.get_attendance_records(
-                start_date=start_date, student_id=student_id
-            )
+            summary = self.attendance_repo.get_student_period_summary(student_id, start_date)
             
             # Calculate statistics
             total_days = days
-            present_days = len([r for r in records if r['status'] == 'present'])
+            present_days = summary['present_days']
             absent_days = total_days - present_days
             attendance_rate = (present_days / total_days * 100) if total_days > 0 else 0
             
-            # Time analysis
-            time_in_records = [r for r in records if r['time_in']]
-            time_out_records = [r for r in records if r['time_out']]
-            
-            return {
+            report = {
                 'student_info': student,
                 'period_days': total_days,
                 'present_days': present_days,
                 'absent_days': absent_days,
                 'attendance_rate': round(attendance_rate, 1),
-                'records': records,
-                'has_time_in': len(time_in_records),
-                'has_time_out': len(time_out_records)
+                'has_time_in': summary['time_in_count'],
+                'has_time_out': summary['time_out_count']
             }
             
+            if include_records:
+                report['records'] = self.attendance_repo.get_attendance_records(
+                    start_date=start_date, student_id=student_id
+                )
+            
+            return report
+            
         except Exception as e:
             logger.error(f"Error getting student attendance report: {e}")
             return {}
@@ -138,29 +163,30 @@ class AttendanceService:
                     'attendance_data': []
                 }
             
-            # Get attendance data for each student
+            # Present-day counts for the whole course in one query
             start_date = date.today() - timedelta(days=days)
-            attendance_data = []
+            present_counts = self.attendance_repo.get_present_counts_by_student(
+                [student['id'] for student in course_students], start_date
+            )
+            counts = np.array(
+                [present_counts.get(student['id'], 0) for student in course_students], dtype=np.int32
+            )
+            rates = np.round(counts * (100.0 / days), 1) if days > 0 else np.zeros(len(counts))
             
-            for student in course_students:
-                records = self.attendance_repo.get_attendance_records(
-                    start_date=start_date, student_id=student['id']
-                )
-                
-                present_days = len([r for r in records if r['status'] == 'present'])
-                attendance_rate = (present_days / days * 100) if days > 0 else 0
-                
-                attendance_data.append({
+            attendance_data = [
+                {
                     'student_id': student['id'],
                     'student_name': student['name'],
                     'roll_number': student['roll_number'],
                     'present_days': present_days,
-                    'attendance_rate': round(attendance_rate, 1)
-                })
+                    'attendance_rate': rate
+                }
+                for student, present_days, rate in zip(course_students, counts.tolist(), rates.tolist())
+            ]
             
             # Calculate course statistics
             total_students = len(course_students)
-            avg_attendance = sum(s['attendance_rate'] for s in attendance_data) / total_students if total_students > 0 else 0
+            avg_attendance = float(rates.mean())
             
             return {
                 'course': course,
@@ -180,7 +206,7 @@ class AttendanceService:
     def get_daily_attendance_trends(self, days: int = 30) -> List[Dict]:
         """Get daily attendance trends"""
         try:
-            analytics = self.attendance_repo.get_attendance_analytics(days)
+            analytics = self.get_attendance_analytics(days)
             return analytics.get('daily_attendance', [])
         except Exception as e:
             logger.error(f"Error getting daily trends: {e}")
@@ -189,33 +215,13 @@ class AttendanceService:
     def get_peak_attendance_hours(self, days: int = 30) -> Dict:
         """Analyze peak attendance hours"""
         try:
-            records = self.attendance_repo.get_attendance_records(
-                start_date=date.today() - timedelta(days=days)
-            )
-            
-            hour_counts = {}
-            
-            for record in records:
-                if record['time_in']:
-                    try:
-                        # Extract hour from time_in
-                        time_str = record['time_in']
-                        if isinstance(time_str, str):
-                            hour = datetime.fromisoformat(time_str).hour
-                        else:
-                            hour = time_str.hour
-                        
-                        hour_counts[hour] = hour_counts.get(hour, 0) + 1
-                    except:
-                        continue
-            
-            # Find peak hour
-            peak_hour = max(hour_counts.keys(), key=lambda k: hour_counts[k]) if hour_counts else None
+            hour_counts = self.attendance_repo.get_hourly_distribution(date.today() - timedelta(days=days))
+            peak_hour = max(hour_counts, key=hour_counts.get) if hour_counts else None
             
             return {
                 'hourly_distribution': hour_counts,
                 'peak_hour': peak_hour,
-                'peak_hour_count': hour_counts.get(peak_hour, 0) if peak_hour else 0
+                'peak_hour_count': hour_counts.get(peak_hour, 0)
             }
             
         except Exception as e:
@@ -226,26 +232,13 @@ class AttendanceService:
                 'peak_hour_count': 0
             }
     
-    def export_attendance_data(self, start_date: date = None, end_date: date = None) -> List[Dict]:
-        """Export attendance data for CSV/Excel"""
+    def export_attendance_data(self, start_date: date = None, end_date: date = None) -> pd.DataFrame:
+        """Export attendance data for CSV/Excel as a DataFrame with display column names"""
         try:
             records = self.attendance_repo.get_attendance_records(start_date, end_date)
-            
-            # Format for export
-            export_data = []
-            for record in records:
-                export_data.append({
-                    'Date': record['date'],
-                    'Student Name': record['student_name'],
-                    'Roll Number': record['roll_number'],
-                    'Time In': record['time_in'],
-                    'Time Out': record['time_out'],
-                    'Status': record['status'],
-                    'Marked By': record['marked_by']
-                })
-            
-            return export_data
+            df = pd.DataFrame.from_records(records, columns=list(EXPORT_COLUMNS))
+            return df.rename(columns=EXPORT_COLUMNS)
             
         except Exception as e:
             logger.error(f"Error exporting attendance data: {e}")
-            return []
+            return pd.DataFrame(columns=list(EXPORT_COLUMNS.values()))
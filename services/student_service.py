@@ -2,10 +2,20 @@
 Student management business logic - Enhanced with debugging
 """
 import logging
+import time
 import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
 from database.student_repository import StudentRepository
-from face_recognition.recognition_engine import FaceRecognitionEngine
+from face_recognition.recognition_engine import (
+    EmbeddingGallery,
+    FaceRecognitionEngine,
+    build_gallery,
+    get_face_engine,
+    gallery_from_arrays,
+)
+from utils.cache import STUDENTS_TAG, analytics_cache
 from utils.embeddings import (
     load_embeddings_cache,
     save_embeddings_cache,
@@ -19,6 +29,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Seconds a StudentService reuses its get_all_students() snapshot
+STUDENTS_CACHE_TTL = 30
+
 
 def _audit_biometric(action: str, *, target_id: str = "", detail: Optional[Dict] = None) -> None:
     """Best-effort audit log for biometric lifecycle events."""
@@ -40,9 +53,17 @@ class StudentService:
     
     def __init__(self):
         self.student_repo = StudentRepository()
-        self.face_engine = FaceRecognitionEngine()
         # In-memory cache of (student_id, name, roll_number, embedding)
         self._embedding_cache: Optional[List[Tuple[int, str, str, object]]] = None
+        # Normalized matrix form of _embedding_cache, rebuilt lazily after it changes
+        self._gallery: Optional[EmbeddingGallery] = None
+        # (monotonic timestamp, students, students by id, STUDENTS_TAG version) snapshot shared by the lookup helpers
+        self._students_cache: Optional[Tuple[float, Tuple[Dict, ...], Dict[int, Dict], int]] = None
+    
+    @property
+    def face_engine(self) -> FaceRecognitionEngine:
+        """Shared recognition engine; the model is only loaded once something needs it."""
+        return get_face_engine()
     
     def add_student_with_photos(self, name: str, roll_number: str, email: str, 
                               phone: str, course: str, images: List, 
@@ -72,24 +93,30 @@ class StudentService:
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            for i, image in enumerate(images):
-                status_text.text(f"Processing image {i+1}/{len(images)}...")
-                progress_bar.progress((i + 1) / len(images))
-                
-                # Generate unique photo ID
-                photo_id = f"{roll_number}_{uuid.uuid4().hex[:8]}"
-                
-                # Debug image processing if needed
-                if debug_mode:
+            if debug_mode:
+                # Debug mode inspects and embeds each photo individually
+                embeddings = []
+                for i, image in enumerate(images):
+                    status_text.text(f"Processing image {i+1}/{len(images)}...")
+                    progress_bar.progress((i + 1) / len(images))
+                    
                     debug_info = self.face_engine.debug_image_processing(image)
                     processing_results.append({
                         'image_index': i + 1,
                         'debug_info': debug_info
                     })
                     self._display_debug_results(i + 1, debug_info)
-                
-                # Generate embedding
-                embedding = self.face_engine.generate_embedding(image, debug_mode=debug_mode)
+                    
+                    embeddings.append(self.face_engine.generate_embedding(image, debug_mode=True))
+            else:
+                # One batched forward pass for all photos
+                status_text.text(f"Processing {len(images)} images...")
+                embeddings = self.face_engine.generate_embeddings_batch(images)
+                progress_bar.progress(1.0)
+            
+            for i, embedding in enumerate(embeddings):
+                # Generate unique photo ID
+                photo_id = f"{roll_number}_{uuid.uuid4().hex[:8]}"
                 
                 if embedding is not None:
                     # Validate embedding quality
@@ -159,6 +186,7 @@ class StudentService:
             )
             
             if success:
+                self._students_cache = None
                 logger.info(f"Student {name} added with {successful_embeddings} face embeddings")
                 _audit_biometric(
                     "biometric_enrolled",
@@ -270,13 +298,39 @@ class StudentService:
                         st.warning(f"   - Face detection: {debug_info.get('face_detection', {}).get('message')}")
 
     def get_all_students(self) -> List[Dict]:
-        """Get all active students"""
-        return self.student_repo.get_all_students()
+        """Get all active students (copies; callers may modify them freely)"""
+        return [dict(student) for student in self._get_all_students_cached()]
+
+    def _students_snapshot(self) -> Optional[Tuple[float, Tuple[Dict, ...], Dict[int, Dict], int]]:
+        """The cached students snapshot, or None when missing, older than STUDENTS_CACHE_TTL,
+        or taken before a student write by any service (repository writes bump STUDENTS_TAG).
+        """
+        cache = self._students_cache
+        if (cache is not None and time.monotonic() - cache[0] < STUDENTS_CACHE_TTL
+                and cache[3] == analytics_cache.tag_version(STUDENTS_TAG)):
+            return cache
+        return None
+
+    def _get_all_students_cached(self) -> Tuple[Dict, ...]:
+        """Active students, reused for STUDENTS_CACHE_TTL seconds between writes.
+
+        The snapshot is shared, so internal readers must not modify it; public
+        methods hand out copies.
+        """
+        cache = self._students_snapshot()
+        if cache is not None:
+            return cache[1]
+        # Version read before the query, so a write racing the load invalidates this snapshot
+        version = analytics_cache.tag_version(STUDENTS_TAG)
+        students = tuple(self.student_repo.get_all_students())
+        self._students_cache = (time.monotonic(), students, {s['id']: s for s in students}, version)
+        return students
     
     def delete_student(self, student_id: int) -> Tuple[bool, str]:
         """Delete student"""
         success, message = self.student_repo.delete_student(student_id)
         if success:
+            self._students_cache = None
             _audit_biometric("biometric_student_deleted", target_id=str(student_id))
             # Invalidate cache so deleted embeddings are not used
             self._refresh_embedding_cache(force_refresh=True)
@@ -286,6 +340,7 @@ class StudentService:
         """Delete student by roll number."""
         success, message = self.student_repo.delete_student_by_roll(roll_number)
         if success:
+            self._students_cache = None
             _audit_biometric("biometric_student_deleted", target_id=roll_number)
             self._refresh_embedding_cache(force_refresh=True)
         return success, message
@@ -300,6 +355,8 @@ class StudentService:
         if not force_refresh and self._embedding_cache is not None:
             return self._embedding_cache
 
+        self._gallery = None
+
         # Try disk cache first
         cached = None if force_refresh else load_embeddings_cache()
         if cached:
@@ -321,6 +378,25 @@ class StudentService:
 
         return self._embedding_cache
     
+    def _get_embeddings_matrix(self) -> EmbeddingGallery:
+        """Gallery matrix for recognition, built once per embedding cache refresh.
+
+        Reuses already-decoded rows (in memory or the encrypted disk cache) when
+        present; otherwise loads the contiguous matrix straight from SQLite.
+        """
+        if self._gallery is None:
+            rows = self._embedding_cache or load_embeddings_cache()
+            quantize = self.face_engine.use_int8_gallery
+            if rows:
+                self._gallery = build_gallery(rows, quantize)
+            else:
+                self._gallery = gallery_from_arrays(*self.student_repo.get_embedding_matrix(), quantize)
+        return self._gallery
+
+    def get_recognition_gallery(self) -> EmbeddingGallery:
+        """The gallery recognize_student scores against (for debug/comparison views)"""
+        return self._get_embeddings_matrix()
+
     def recognize_student(self, image) -> Tuple[bool, Optional[Dict], float, Dict]:
         """Recognize student from image. Fourth return value is decision metadata (margin, reason)."""
         empty_meta = {
@@ -329,15 +405,21 @@ class StudentService:
             "second_similarity": 0.0,
         }
         try:
-            student_embeddings = self._refresh_embedding_cache()
-
-            if not student_embeddings:
+            gallery = self._gallery
+            if gallery is not None and not len(gallery.student_ids):
                 empty_meta["reason"] = "no_gallery"
                 return False, None, 0.0, empty_meta
 
-            is_recognized, student_info, confidence, meta = self.face_engine.recognize_face(
-                image, student_embeddings
-            )
+            if gallery is not None:
+                is_recognized, student_info, confidence, meta = self.face_engine.recognize_face(
+                    image, gallery
+                )
+            else:
+                # Cold gallery: load it from the DB while the probe face is embedded
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    is_recognized, student_info, confidence, meta = self.face_engine.recognize_face(
+                        image, executor.submit(self._get_embeddings_matrix)
+                    )
 
             if is_recognized:
                 logger.info(
@@ -363,11 +445,12 @@ class StudentService:
     def get_student_by_id(self, student_id: int) -> Optional[Dict]:
         """Get student details by ID"""
         try:
-            students = self.student_repo.get_all_students()
-            for student in students:
-                if student['id'] == student_id:
-                    return student
-            return None
+            cache = self._students_snapshot()
+            student = cache[2].get(student_id) if cache is not None else None
+            if student is not None:
+                return dict(student)
+            # Primary-key query on a miss: the student may have been enrolled through another service
+            return self.student_repo.get_student(student_id)
         except Exception as e:
             logger.error(f"Error getting student by ID: {e}")
             return None
@@ -375,20 +458,12 @@ class StudentService:
     def search_students(self, search_term: str) -> List[Dict]:
         """Search students by name, roll number, or email"""
         try:
-            all_students = self.student_repo.get_all_students()
-            search_term = search_term.lower().strip()
+            search_term = search_term.strip()
             
             if not search_term:
-                return all_students
+                return self.get_all_students()
             
-            filtered_students = []
-            for student in all_students:
-                if (search_term in student['name'].lower() or 
-                    search_term in student['roll_number'].lower() or 
-                    (student['email'] and search_term in student['email'].lower())):
-                    filtered_students.append(student)
-            
-            return filtered_students
+            return self.student_repo.search(search_term)
             
         except Exception as e:
             logger.error(f"Error searching students: {e}")
@@ -397,8 +472,7 @@ class StudentService:
     def get_students_by_course(self, course: str) -> List[Dict]:
         """Get students filtered by course"""
         try:
-            all_students = self.student_repo.get_all_students()
-            return [s for s in all_students if s.get('course', '').lower() == course.lower()]
+            return self.student_repo.get_by_course(course)
         except Exception as e:
             logger.error(f"Error getting students by course: {e}")
             return []
@@ -417,8 +491,10 @@ class StudentService:
         """Delete all students and their data"""
         success, message = self.student_repo.delete_all_students()
         if success:
+            self._students_cache = None
             _audit_biometric("biometric_all_students_deleted", detail={"scope": "all_students"})
             self._embedding_cache = []
+            self._gallery = None
             clear_embeddings_cache()
         return success, message
 
@@ -426,6 +502,7 @@ class StudentService:
         """Purge embeddings for inactive students that are outside retention."""
         count, message = self.student_repo.purge_inactive_biometrics()
         if count:
+            self._students_cache = None
             _audit_biometric("biometric_retention_purge", detail={"deleted_embeddings": count})
             self._refresh_embedding_cache(force_refresh=True)
         return count, message
@@ -433,37 +510,18 @@ class StudentService:
     def get_student_statistics(self) -> Dict:
         """Get student statistics"""
         try:
-            students = self.student_repo.get_all_students()
-            
-            if not students:
-                return {
-                    'total_students': 0,
-                    'by_course': {},
-                    'with_photos': 0,
-                    'without_photos': 0
-                }
-            
-            # Calculate statistics
-            by_course = {}
-            with_photos = 0
-            without_photos = 0
-            
-            for student in students:
-                # Course statistics
-                course = student.get('course', 'Unknown')
-                by_course[course] = by_course.get(course, 0) + 1
-                
-                # Photo statistics
-                if student.get('photo_count', 0) > 0:
-                    with_photos += 1
-                else:
-                    without_photos += 1
+            cache = self._students_snapshot()
+            if cache is None:
+                return self.student_repo.get_statistics()
             
+            # A warm snapshot is already in memory; count it instead of querying
+            students = cache[1]
+            with_photos = sum(1 for s in students if s.get('photo_count', 0) > 0)
             return {
                 'total_students': len(students),
-                'by_course': by_course,
+                'by_course': dict(Counter(s.get('course', 'Unknown') for s in students)),
                 'with_photos': with_photos,
-                'without_photos': without_photos
+                'without_photos': len(students) - with_photos
             }
             
         except Exception as e:
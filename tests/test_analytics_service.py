@@ -0,0 +1,416 @@
+"""Analytics service aggregation tests against a seeded SQLite database."""
+
+from datetime import date, timedelta
+
+import pytest
+
+import database.connection as db_connection
+from database.attendance_repository import AttendanceRepository
+from database.connection import get_db_connection, init_database
+from services.analytics_service import AnalyticsService, summarize_student_performance
+from utils.cache import analytics_cache
+
+
+def _seed(students, attendance):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for name, roll, course in students:
+            cursor.execute(
+                "INSERT INTO students (name, roll_number, email, course) VALUES (?, ?, ?, ?)",
+                (name, roll, f"{roll.lower()}@example.com", course),
+            )
+        for roll, day, time_in in attendance:
+            cursor.execute(
+                """
+                INSERT INTO attendance (student_id, date, time_in, status, marked_by)
+                SELECT id, ?, ?, 'present', 'test' FROM students WHERE roll_number = ?
+                """,
+                (day.isoformat(), time_in, roll),
+            )
+        conn.commit()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_connection, "DB_FILE", tmp_path / "attendance.db")
+    analytics_cache.clear()
+    init_database()
+    return AnalyticsService()
+
+
+def test_overview_stats_single_query(service):
+    today = date.today()
+    _seed(
+        [("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE"), ("Cara", "EE001", "EE")],
+        [
+            ("CS001", today, f"{today}T08:55:00"),
+            ("CS002", today, f"{today}T09:10:00"),
+            ("CS001", today - timedelta(days=1), f"{today - timedelta(days=1)}T08:40:00"),
+        ],
+    )
+
+    overview = service.get_overview_stats()
+
+    assert overview["total_students"] == 3
+    assert overview["present_today"] == 2
+    assert overview["absent_today"] == 1
+    assert overview["total_records"] == 3
+    assert overview["avg_daily_attendance"] == 1.5
+    assert overview["attendance_rate_today"] == 66.7
+
+
+def test_weekly_summary_counts_both_weeks(service):
+    this_week_start = date.today() - timedelta(days=date.today().weekday())
+    last_week_day = this_week_start - timedelta(days=3)
+    _seed(
+        [("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE")],
+        [
+            ("CS001", this_week_start, f"{this_week_start}T09:00:00"),
+            ("CS001", last_week_day, f"{last_week_day}T09:00:00"),
+            ("CS002", last_week_day, f"{last_week_day}T09:00:00"),
+        ],
+    )
+
+    summary = service.get_weekly_summary(last_week_day, date.today())
+
+    assert summary["this_week"] == 1
+    assert summary["last_week"] == 2
+    assert summary["change_percent"] == -50.0
+    assert summary["trend"] == "down"
+
+
+def test_trend_predictions_compare_trailing_weeks(service):
+    today = date.today()
+    rolls = [f"CS{i:03d}" for i in range(1, 5)]
+    attendance = []
+    for offset in range(14):
+        day = today - timedelta(days=13 - offset)
+        # Two students per day in the older week, four in the recent one.
+        present = rolls if offset >= 7 else rolls[:2]
+        attendance.extend((roll, day, f"{day}T09:00:00") for roll in present)
+    _seed([(f"Student {roll}", roll, "CSE") for roll in rolls], attendance)
+
+    trend = service.get_trend_predictions(today - timedelta(days=13), today)
+
+    assert trend["trend"] == "increasing"
+    assert trend["recent_average"] == 4.0
+    assert trend["previous_average"] == 2.0
+    assert trend["change"] == 2.0
+
+
+def test_time_patterns_bin_hours_and_weekdays(service):
+    monday = date.today() - timedelta(days=date.today().weekday() + 7)
+    tuesday = monday + timedelta(days=1)
+    _seed(
+        [("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE")],
+        [
+            ("CS001", monday, f"{monday}T08:15:00"),
+            ("CS002", monday, f"{monday}T09:05:00"),
+            ("CS001", tuesday, f"{tuesday}T09:45:00"),
+        ],
+    )
+
+    patterns = service.get_time_pattern_analysis(monday, tuesday)
+
+    assert patterns["hourly_checkins"] == [
+        {"hour": "08:00", "count": 1},
+        {"hour": "09:00", "count": 2},
+    ]
+    assert patterns["weekly_patterns"] == [
+        {"day": "Monday", "count": 2},
+        {"day": "Tuesday", "count": 1},
+    ]
+    assert patterns["peak_hour"] == "09:00"
+    assert patterns["total_checkins"] == 3
+
+
+def test_time_patterns_empty_range(service):
+    patterns = service.get_time_pattern_analysis(date.today(), date.today())
+
+    assert patterns["hourly_checkins"] == []
+    assert patterns["weekly_patterns"] == []
+    assert patterns["peak_hour"] == "N/A"
+    assert patterns["total_checkins"] == 0
+
+
+def test_course_analytics_averages_daily_attendance(service):
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    _seed(
+        [
+            ("Alice", "CS001", "CSE"),
+            ("Bob", "CS002", "CSE"),
+            ("Cara", "EE001", "EE"),
+        ],
+        [
+            ("CS001", today, f"{today}T09:00:00"),
+            ("CS002", today, f"{today}T09:00:00"),
+            ("CS001", yesterday, f"{yesterday}T09:00:00"),
+        ],
+    )
+
+    courses = service.get_course_wise_analytics(yesterday, today)
+
+    assert [c["course"] for c in courses] == ["CSE", "EE"]
+    cse, ee = courses
+    assert cse["total_students"] == 2
+    assert cse["avg_daily_attendance"] == 1.5
+    assert cse["attendance_rate"] == 75.0
+    assert cse["rating"] == "Good"
+    assert cse["active_days"] == 2
+    assert cse["students_with_attendance"] == 2
+    assert ee["avg_daily_attendance"] == 0.0
+    assert ee["rating"] == "Needs Attention"
+    assert ee["color"] == "#ef4444"
+
+
+def test_comprehensive_analytics_collects_every_section(service):
+    today = date.today()
+    _seed([("Alice", "CS001", "CSE")], [("CS001", today, f"{today}T09:00:00")])
+
+    analytics = service.get_comprehensive_analytics(days_back=7)
+
+    assert list(analytics) == [
+        "overview",
+        "daily_trends",
+        "student_performance",
+        "course_analytics",
+        "time_patterns",
+        "weekly_summary",
+        "alerts",
+        "predictions",
+        "student_performance_summary",
+    ]
+    assert analytics["overview"]["present_today"] == 1
+    assert analytics["course_analytics"][0]["course"] == "CSE"
+
+
+def test_alerts_compute_days_absent_in_sql(service):
+    today = date.today()
+    _seed(
+        [("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE"), ("Cara", "CS003", "CSE")],
+        [
+            ("CS001", today, f"{today}T09:00:00"),
+            ("CS002", today - timedelta(days=8), f"{today - timedelta(days=8)}T09:00:00"),
+        ],
+    )
+
+    alerts = service.get_attendance_alerts()
+    absences = {a["student"]: a for a in alerts if a["type"] == "consecutive_absence"}
+
+    assert set(absences) == {"Bob", "Cara"}
+    assert absences["Bob"]["days_absent"] == 8
+    assert absences["Bob"]["severity"] == "high"
+    assert absences["Cara"]["days_absent"] == 30
+
+
+def test_daily_trends_label_weekdays(service):
+    monday = date.today() - timedelta(days=date.today().weekday() + 7)
+    _seed([("Alice", "CS001", "CSE")], [("CS001", monday, f"{monday}T09:00:00")])
+
+    trends = service.get_daily_attendance_trends(monday, monday + timedelta(days=6))
+
+    assert [(t["date"], t["day_name"]) for t in trends] == [(monday.isoformat(), "Monday")]
+
+
+def test_student_performance_categories_from_sql(service):
+    today = date.today()
+    days = [today - timedelta(days=offset) for offset in range(4)]
+    _seed(
+        [("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE"), ("Cara", "CS003", "CSE")],
+        [("CS001", day, f"{day}T08:30:00") for day in days]
+        + [("CS002", day, f"{day}T09:30:00") for day in days[:3]]
+        + [("CS003", days[0], f"{days[0]}T09:00:00")],
+    )
+
+    performance = service.get_student_performance_analysis(days[-1], today)
+    by_name = {p["name"]: p for p in performance}
+
+    assert [p["name"] for p in performance] == ["Alice", "Bob", "Cara"]
+    assert by_name["Alice"]["attendance_percentage"] == 100.0
+    assert (by_name["Alice"]["category"], by_name["Alice"]["status"]) == ("Excellent", "🟢")
+    assert by_name["Bob"]["attendance_percentage"] == 75.0
+    assert by_name["Bob"]["category"] == "Good"
+    assert by_name["Bob"]["late_days"] == 3
+    assert by_name["Cara"]["category"] == "Poor"
+    assert by_name["Cara"]["working_days"] == 4
+
+
+def test_export_report_only_runs_embedded_sections(service, monkeypatch):
+    today = date.today()
+    _seed([("Alice", "CS001", "CSE")], [("CS001", today, f"{today}T09:00:00")])
+
+    def _unexpected(*args, **kwargs):
+        raise AssertionError("section not part of the export report")
+
+    for name in ("get_time_pattern_analysis", "get_weekly_summary", "get_trend_predictions"):
+        monkeypatch.setattr(service, name, _unexpected)
+
+    report = service.export_analytics_report(today - timedelta(days=7), today)
+
+    assert report["report_period"] == f"{today - timedelta(days=7)} to {today}"
+    assert report["summary"]["present_today"] == 1
+    assert report["student_performance"][0]["name"] == "Alice"
+    assert report["daily_trends"][0]["date"] == today.isoformat()
+
+
+def test_time_in_sod_maintained_and_backfilled(service):
+    today = date.today()
+    _seed(
+        [("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE")],
+        [
+            ("CS001", today, f"{today}T09:00:59"),
+            ("CS002", today, f"{today}T09:01:00"),
+        ],
+    )
+
+    with get_db_connection() as conn:
+        rows = dict(conn.execute(
+            "SELECT s.roll_number, a.time_in_sod FROM attendance a JOIN students s ON s.id = a.student_id"
+        ).fetchall())
+        conn.execute("UPDATE attendance SET time_in = ? WHERE time_in_sod = 32400", (f"{today}T08:30:00",))
+        # Simulate a database created before the column existed
+        conn.execute("DROP TRIGGER trg_attendance_time_in_sod_insert")
+        conn.execute("DROP TRIGGER trg_attendance_time_in_sod_update")
+        conn.execute("ALTER TABLE attendance DROP COLUMN time_in_sod")
+        conn.commit()
+
+    assert rows == {"CS001": 32400, "CS002": 32460}
+
+    init_database()
+    performance = {p["name"]: p for p in service.get_student_performance_analysis(today, today)}
+
+    assert performance["Alice"]["avg_arrival_time"] == "08:30"
+    assert performance["Alice"]["late_days"] == 0
+    assert performance["Bob"]["late_days"] == 1
+
+
+def test_working_days_cached_per_window(service):
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    _seed([("Alice", "CS001", "CSE")], [("CS001", today, f"{today}T09:00:00")])
+
+    first = service.get_student_performance_analysis(yesterday, today)
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM attendance")
+        conn.commit()
+    second = service.get_student_performance_analysis(yesterday, today)
+
+    # Uncached, an empty window would fall back to the two calendar days
+    assert first[0]["working_days"] == second[0]["working_days"] == 1
+    assert len(analytics_cache) == 1
+
+
+def test_marking_attendance_invalidates_todays_windows(service):
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    _seed(
+        [("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE")],
+        [("CS001", yesterday, f"{yesterday}T09:00:00")],
+    )
+
+    before = service.get_student_performance_analysis(yesterday, today)
+    service.get_student_performance_analysis(yesterday, yesterday)
+    assert len(analytics_cache) == 2
+
+    with get_db_connection() as conn:
+        bob_id = conn.execute("SELECT id FROM students WHERE roll_number = 'CS002'").fetchone()["id"]
+    ok, _ = AttendanceRepository().mark_attendance(bob_id)
+    after = service.get_student_performance_analysis(yesterday, today)
+
+    assert ok
+    assert before[0]["working_days"] == 1
+    assert after[0]["working_days"] == 2
+    # The past-only window is untouched by a write for today
+    assert ("working_days", str(yesterday), str(yesterday)) in analytics_cache._data
+
+
+def test_marking_time_out_invalidates_cached_analytics(service):
+    today = date.today()
+    _seed([("Alice", "CS001", "CSE")], [("CS001", today, f"{today}T09:00:00")])
+
+    def todays_checkouts():
+        analytics = service.get_comprehensive_analytics(days_back=7)
+        trend = next(row for row in analytics["daily_trends"] if row["date"] == today.isoformat())
+        alice = next(row for row in analytics["student_performance"] if row["roll_number"] == "CS001")
+        return trend["checked_out"], alice["days_checked_out"]
+
+    assert todays_checkouts() == (0, 0)
+
+    with get_db_connection() as conn:
+        alice_id = conn.execute("SELECT id FROM students WHERE roll_number = 'CS001'").fetchone()["id"]
+    ok, message = AttendanceRepository().mark_attendance(alice_id)
+
+    assert ok and message.startswith("Time-out")
+    assert todays_checkouts() == (1, 1)
+
+
+def test_low_attendance_alert_messages(service):
+    today = date.today()
+    days = [today - timedelta(days=offset) for offset in range(5)]
+    _seed(
+        [("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE")],
+        [("CS001", day, f"{day}T09:00:00") for day in days]
+        + [("CS002", days[0], f"{days[0]}T09:00:00")],
+    )
+
+    alerts = service.get_attendance_alerts()
+    low = [a for a in alerts if a["type"] == "low_attendance"]
+
+    assert low == [{
+        "type": "low_attendance",
+        "severity": "high",
+        "title": "Low Attendance Alert",
+        "message": "Bob (CS002) has 20.0% attendance (1/5 days)",
+        "student": "Bob",
+        "action": "Contact student/parent",
+        "attendance_rate": 20.0,
+    }]
+    assert isinstance(low[0]["attendance_rate"], float)
+
+
+def test_comprehensive_analytics_memoized_until_refresh_or_write(service, monkeypatch):
+    today = date.today()
+    _seed([("Alice", "CS001", "CSE"), ("Bob", "CS002", "CSE")], [("CS001", today, f"{today}T09:00:00")])
+    calls = []
+    original = service._build_comprehensive_analytics
+
+    def counting_build(days_back):
+        calls.append(days_back)
+        return original(days_back)
+
+    monkeypatch.setattr(service, "_build_comprehensive_analytics", counting_build)
+
+    first = service.get_comprehensive_analytics(days_back=7)
+    assert service.get_comprehensive_analytics(days_back=7) is first
+    assert calls == [7]
+
+    service.refresh_comprehensive_analytics(7)
+    service.get_comprehensive_analytics(days_back=7)
+    assert calls == [7, 7]
+
+    with get_db_connection() as conn:
+        bob_id = conn.execute("SELECT id FROM students WHERE roll_number = 'CS002'").fetchone()["id"]
+    ok, _ = AttendanceRepository().mark_attendance(bob_id)
+    assert ok
+    assert service.get_comprehensive_analytics(days_back=7)["overview"]["present_today"] == 2
+    assert calls == [7, 7, 7]
+
+
+def test_student_performance_summary_matches_rows():
+    performance = [
+        {"name": "Alice", "category": "Excellent", "attendance_percentage": 95.0},
+        {"name": "Bob", "category": "Poor", "attendance_percentage": 40.0},
+        {"name": "Cara", "category": "Excellent", "attendance_percentage": 95.0},
+        {"name": "Dev", "category": "Good", "attendance_percentage": 80.0},
+    ]
+
+    summary = summarize_student_performance(performance)
+
+    assert summary["category_counts"] == {"Excellent": 2, "Poor": 1, "Good": 1}
+    assert list(summary["category_counts"])[0] == "Excellent"
+    assert [p["name"] for p in summary["top_performers"]] == ["Alice", "Cara", "Dev", "Bob"]
+    assert summary["excellent_count"] == 2
+    assert summary["poor_count"] == 1
+    assert summary["avg_attendance"] == 77.5
+    assert summarize_student_performance([])["avg_attendance"] == 0.0
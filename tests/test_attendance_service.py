@@ -0,0 +1,167 @@
+"""Attendance service reporting tests against a seeded SQLite database."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import database.connection as db_connection
+from database.connection import get_db_connection, init_database
+from database.student_repository import StudentRepository
+from services.attendance_service import AttendanceService
+from utils.cache import analytics_cache
+
+
+def _add_student(repo, name, roll, course):
+    success, message = repo.add_student_with_photos(
+        name=name,
+        roll_number=roll,
+        email=f"{roll.lower()}@example.com",
+        phone="",
+        course=course,
+        embeddings_data=[(f"photo-{roll}", np.ones(512, dtype=np.float32))],
+    )
+    assert success, message
+    with get_db_connection() as conn:
+        return conn.execute("SELECT id FROM students WHERE roll_number = ?", (roll,)).fetchone()["id"]
+
+
+def _add_attendance(student_id, day, status="present", time_out=None):
+    with get_db_connection() as conn:
+        conn.execute(
+            "INSERT INTO attendance (student_id, date, time_in, time_out, status, marked_by) VALUES (?, ?, ?, ?, ?, 'test')",
+            (student_id, day.isoformat(), f"{day}T09:00:00", time_out, status),
+        )
+        conn.commit()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_connection, "DB_FILE", tmp_path / "attendance.db")
+    analytics_cache.clear()
+    init_database()
+    return AttendanceService()
+
+
+def test_course_summary_counts_present_days_per_student(service):
+    repo = StudentRepository()
+    alice = _add_student(repo, "Alice", "CS001", "CSE")
+    bob = _add_student(repo, "Bob", "CS002", "CSE")
+    _add_student(repo, "Cara", "EE001", "EE")
+    today = date.today()
+    for offset in range(3):
+        _add_attendance(alice, today - timedelta(days=offset))
+    _add_attendance(bob, today, status="late")
+    _add_attendance(bob, today - timedelta(days=1))
+    _add_attendance(bob, today - timedelta(days=20))
+
+    summary = service.get_course_attendance_summary("CSE", days=10)
+
+    by_roll = {row["roll_number"]: row for row in summary["attendance_data"]}
+    assert summary["total_students"] == 2
+    assert by_roll["CS001"]["present_days"] == 3
+    assert by_roll["CS001"]["attendance_rate"] == 30.0
+    assert by_roll["CS002"]["present_days"] == 1
+    assert summary["average_attendance_rate"] == 20.0
+
+
+def test_present_counts_handles_empty_id_list(service):
+    assert service.attendance_repo.get_present_counts_by_student([], date.today()) == {}
+
+
+def test_student_report_uses_summary_counts(service):
+    repo = StudentRepository()
+    alice = _add_student(repo, "Alice", "CS001", "CSE")
+    today = date.today()
+    _add_attendance(alice, today, time_out=f"{today}T17:00:00")
+    _add_attendance(alice, today - timedelta(days=1))
+    _add_attendance(alice, today - timedelta(days=2), status="late")
+
+    report = service.get_student_attendance_report(alice, days=10)
+
+    assert report["present_days"] == 2
+    assert report["absent_days"] == 8
+    assert report["attendance_rate"] == 20.0
+    assert report["has_time_in"] == 3
+    assert report["has_time_out"] == 1
+    assert "records" not in report
+
+    detailed = service.get_student_attendance_report(alice, days=10, include_records=True)
+    assert len(detailed["records"]) == 3
+
+
+def test_peak_hours_histogram(service):
+    repo = StudentRepository()
+    ids = [_add_student(repo, f"S{i}", f"CS00{i}", "CSE") for i in range(3)]
+    today = date.today()
+    with get_db_connection() as conn:
+        for student_id, time_in in zip(ids, ("08:10:00", "09:05:00", "09:55:00")):
+            conn.execute(
+                "INSERT INTO attendance (student_id, date, time_in, status) VALUES (?, ?, ?, 'present')",
+                (student_id, today.isoformat(), f"{today}T{time_in}"),
+            )
+        conn.commit()
+
+    peak = service.get_peak_attendance_hours(days=7)
+
+    assert peak == {
+        "hourly_distribution": {8: 1, 9: 2},
+        "peak_hour": 9,
+        "peak_hour_count": 2,
+    }
+
+
+def test_peak_hours_without_checkins(service):
+    assert service.get_peak_attendance_hours(days=7) == {
+        "hourly_distribution": {},
+        "peak_hour": None,
+        "peak_hour_count": 0,
+    }
+
+
+def test_export_returns_dataframe_with_display_columns(service):
+    alice = _add_student(service.student_service.student_repo, "Alice", "CS001", "CSE")
+    today = date.today()
+    _add_attendance(alice, today, time_out=f"{today}T17:00:00")
+
+    df = service.export_attendance_data(today, today)
+
+    assert list(df.columns) == ["Date", "Student Name", "Roll Number", "Time In", "Time Out", "Status", "Marked By"]
+    assert df.to_dict("records") == [{
+        "Date": today.isoformat(),
+        "Student Name": "Alice",
+        "Roll Number": "CS001",
+        "Time In": f"{today}T09:00:00",
+        "Time Out": f"{today}T17:00:00",
+        "Status": "present",
+        "Marked By": "test",
+    }]
+
+    empty = service.export_attendance_data(today + timedelta(days=1))
+    assert empty.empty and list(empty.columns) == list(df.columns)
+
+
+def test_attendance_analytics_memoized_until_attendance_or_students_change(service, monkeypatch):
+    repo = service.student_service.student_repo
+    alice = _add_student(repo, "Alice", "CS001", "CSE")
+    calls = []
+    original = service.attendance_repo.get_attendance_analytics
+
+    def counting_analytics(days):
+        calls.append(days)
+        return original(days)
+
+    monkeypatch.setattr(service.attendance_repo, "get_attendance_analytics", counting_analytics)
+
+    first = service.get_attendance_analytics(7)
+    assert service.get_daily_attendance_trends(7) == first["daily_attendance"] == []
+    assert calls == [7]
+
+    success, message = service.mark_attendance_manual(alice)
+    assert success, message
+    assert len(service.get_attendance_analytics(7)["daily_attendance"]) == 1
+    assert calls == [7, 7]
+
+    _add_student(repo, "Bob", "CS002", "CSE")
+    assert len(service.get_attendance_analytics(7)["student_attendance"]) == 2
+    assert calls == [7, 7, 7]
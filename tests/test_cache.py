@@ -0,0 +1,64 @@
+from utils import cache as cache_module
+from utils.cache import TTLCache
+
+
+def test_get_or_set_memoises_until_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=4, ttl=10)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_set("k", factory) == 1
+    assert cache.get_or_set("k", factory) == 1
+    now[0] += 10
+    assert cache.get_or_set("k", factory) == 2
+    assert len(calls) == 2
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_caches_falsy_values():
+    cache = TTLCache()
+    cache.set("zero", 0)
+
+    assert cache.get_or_set("zero", lambda: 99) == 0
+    assert cache.pop("zero") == 0
+    assert len(cache) == 0
+
+
+def test_invalidate_tag_drops_only_tagged_entries():
+    cache = TTLCache()
+    cache.set("today", 1, tags=("date:today",))
+    cache.set("both", 2, tags=("date:today", "course:cs"))
+    cache.set("past", 3)
+
+    assert cache.invalidate_tag("date:today") == 2
+    assert cache.get("today") is None
+    assert cache.get("both") is None
+    assert cache.get("past") == 3
+    assert cache.invalidate_tag("course:cs") == 0
+
+
+def test_tag_version_changes_on_invalidation_and_clear():
+    cache = TTLCache()
+    assert cache.tag_version("students") == 0
+
+    cache.invalidate_tag("students")
+    assert cache.tag_version("students") == 1
+
+    cache.clear()
+    assert cache.tag_version("students") == 2
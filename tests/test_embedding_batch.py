@@ -0,0 +1,128 @@
+"""Batched embedding generation with a stubbed DeepFace backend."""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import face_recognition.recognition_engine as recognition_engine
+from face_recognition.recognition_engine import FaceRecognitionEngine
+
+
+class _BatchingDeepFace:
+    """Mimics DeepFace.represent for list inputs: one result list per image."""
+
+    def __init__(self, fail_batches=False):
+        self.calls = []
+        self.fail_batches = fail_batches
+
+    def represent(self, img_path, **kwargs):
+        self.calls.append(img_path)
+        self.kwargs = kwargs
+        if isinstance(img_path, list):
+            if self.fail_batches:
+                raise ValueError("unsupported input")
+            return [[{"embedding": [float(i + 1)] * 512}] for i in range(len(img_path))]
+        return [{"embedding": [2.0] * 512}]
+
+
+@pytest.fixture
+def engine():
+    with patch.object(FaceRecognitionEngine, "_initialize_models", lambda self: None):
+        return FaceRecognitionEngine()
+
+
+def _images(n):
+    return [np.full((64, 64, 3), 100 + i, dtype=np.uint8) for i in range(n)]
+
+
+def test_batch_runs_single_forward_pass(engine, monkeypatch):
+    fake = _BatchingDeepFace()
+    monkeypatch.setattr(recognition_engine, "_deepface", lambda: fake)
+
+    embeddings = engine.generate_embeddings_batch(_images(3))
+
+    assert len(fake.calls) == 1
+    assert isinstance(fake.calls[0], list) and len(fake.calls[0]) == 3
+    for embedding in embeddings:
+        assert embedding.shape == (512,)
+        assert np.isclose(np.linalg.norm(embedding), 1.0)
+
+
+def test_batch_generate_embeddings_alias_uses_batched_pass(engine, monkeypatch):
+    fake = _BatchingDeepFace()
+    monkeypatch.setattr(recognition_engine, "_deepface", lambda: fake)
+
+    embeddings = engine.batch_generate_embeddings(_images(2))
+
+    assert len(fake.calls) == 1
+    assert len(embeddings) == 2 and all(embedding is not None for embedding in embeddings)
+
+
+def test_batch_falls_back_per_image(engine, monkeypatch):
+    fake = _BatchingDeepFace(fail_batches=True)
+    monkeypatch.setattr(recognition_engine, "_deepface", lambda: fake)
+    fallback_calls = []
+
+    def fake_generate_embedding(image, debug_mode=False):
+        fallback_calls.append(image)
+        return np.ones(512, dtype=np.float32) / np.sqrt(512)
+
+    monkeypatch.setattr(engine, "generate_embedding", fake_generate_embedding)
+
+    embeddings = engine.generate_embeddings_batch(_images(2))
+
+    assert len(fallback_calls) == 2
+    assert all(embedding is not None for embedding in embeddings)
+
+
+def test_skip_detection_batch_embeds_crops_in_one_pass(engine, monkeypatch):
+    fake = _BatchingDeepFace()
+    monkeypatch.setattr(recognition_engine, "_deepface", lambda: fake)
+
+    embeddings = engine.generate_embeddings_without_detection(_images(2))
+
+    assert len(fake.calls) == 1 and len(fake.calls[0]) == 2
+    assert fake.kwargs["detector_backend"] == "skip"
+    assert fake.kwargs["enforce_detection"] is False
+    assert all(np.isclose(np.linalg.norm(embedding), 1.0) for embedding in embeddings)
+
+
+def test_skip_detection_batch_falls_back_per_image(engine, monkeypatch):
+    fake = _BatchingDeepFace(fail_batches=True)
+    monkeypatch.setattr(recognition_engine, "_deepface", lambda: fake)
+
+    embeddings = engine.generate_embeddings_without_detection(_images(2))
+
+    assert len(fake.calls) == 3
+    assert fake.kwargs["detector_backend"] == "skip"
+    assert all(embedding.shape == (512,) for embedding in embeddings)
+
+
+def test_generate_embedding_reuses_result_for_same_image(engine, monkeypatch):
+    calls = []
+
+    def fake_approaches(image, debug_mode=False):
+        calls.append(image)
+        return np.full(512, 2.0, dtype=np.float32)
+
+    monkeypatch.setattr(engine, "_try_multiple_detection_approaches", fake_approaches)
+    first, second = _images(2)
+
+    embedding = engine.generate_embedding(first)
+    embedding[:] = 0
+    again = engine.generate_embedding(first.copy())
+    engine.generate_embedding(second)
+
+    assert len(calls) == 2
+    assert np.isclose(np.linalg.norm(again), 1.0)
+
+
+def test_generate_embedding_retries_after_a_failure(engine, monkeypatch):
+    results = [None, np.full(512, 2.0, dtype=np.float32)]
+    monkeypatch.setattr(engine, "_try_multiple_detection_approaches", lambda image, debug_mode=False: results.pop(0))
+    image = _images(1)[0]
+
+    assert engine.generate_embedding(image) is None
+    assert engine.generate_embedding(image) is not None
+    assert results == []
@@ -5,7 +5,7 @@ from unittest.mock import patch
 import numpy as np
 import pytest
 
-from face_recognition.recognition_engine import FaceRecognitionEngine
+from face_recognition.recognition_engine import FaceRecognitionEngine, build_gallery, gallery_similarities
 
 
 @pytest.fixture
@@ -69,3 +69,60 @@ def test_multi_template_max_per_student(engine):
         ok, info, conf, meta = engine.recognize_face(img, known)
     assert ok is True
     assert info["student_id"] == 7
+
+
+def test_prebuilt_gallery_matches_row_list(engine):
+    rng = np.random.default_rng(3)
+    probe = _norm(rng.standard_normal(512))
+    known = [
+        (1, "A", "1", _norm(rng.standard_normal(512))),
+        (2, "B", "2", _norm(probe + rng.standard_normal(512) * 0.02)),
+        (2, "B", "2", _norm(rng.standard_normal(512))),
+    ]
+    gallery = build_gallery(known)
+    img = np.zeros((64, 64, 3), dtype=np.uint8)
+    with patch.object(engine, "generate_embedding", return_value=probe):
+        from_rows = engine.recognize_face(img, known)
+        from_gallery = engine.recognize_face(img, gallery)
+    assert from_rows[:3] == from_gallery[:3]
+    assert from_gallery[1]["student_id"] == 2
+    assert gallery.matrix.flags["C_CONTIGUOUS"]
+    assert list(gallery.student_ids) == [1, 2]
+
+
+def test_empty_gallery(engine):
+    img = np.zeros((64, 64, 3), dtype=np.uint8)
+    with patch.object(engine, "generate_embedding", return_value=_norm(np.ones(512))):
+        ok, info, conf, meta = engine.recognize_face(img, build_gallery([]))
+    assert ok is False
+    assert meta["reason"] == "no_gallery"
+
+
+def test_int8_gallery_tracks_float_scores(engine):
+    rng = np.random.default_rng(5)
+    probe = _norm(rng.standard_normal(512))
+    known = [(i, f"S{i}", str(i), _norm(probe + rng.standard_normal(512) * 0.02 * i))
+             for i in range(1, 6)]
+    img = np.zeros((64, 64, 3), dtype=np.uint8)
+    with patch.object(engine, "generate_embedding", return_value=probe):
+        exact = engine.recognize_face(img, build_gallery(known))
+        quantized = engine.recognize_face(img, build_gallery(known, quantize=True))
+    assert build_gallery(known, quantize=True).quantized.dtype == np.int8
+    assert quantized[1]["student_id"] == exact[1]["student_id"] == 1
+    assert abs(quantized[2] - exact[2]) < 0.01
+    assert abs(quantized[3]["second_similarity"] - exact[3]["second_similarity"]) < 0.01
+
+
+def test_gallery_similarities_score_every_template():
+    rng = np.random.default_rng(7)
+    rows = [_norm(rng.standard_normal(512)) for _ in range(4)]
+    known = [(i // 2, f"S{i // 2}", str(i // 2), row) for i, row in enumerate(rows)]
+    probe = rows[2] * 3.0
+
+    exact = gallery_similarities(build_gallery(known), probe)
+    quantized = gallery_similarities(build_gallery(known, quantize=True), probe)
+
+    expected = np.array([float(np.dot(row, rows[2])) for row in rows])
+    assert exact.shape == (4,)
+    assert np.allclose(exact, expected, atol=1e-5)
+    assert np.allclose(quantized, expected, atol=0.01)
@@ -77,3 +77,144 @@ def test_purge_inactive_biometrics_removes_retained_embeddings(tmp_path, monkeyp
     deleted_count, message = repo.purge_inactive_biometrics(retention_days=1)
     assert deleted_count == 1
     assert "purged" in message.lower()
+
+
+def test_get_student_returns_active_student_only(tmp_path, monkeypatch):
+    db_file = tmp_path / "attendance.db"
+    monkeypatch.setattr(db_connection, "DB_FILE", db_file)
+
+    init_database()
+
+    repo = StudentRepository()
+    embedding = np.ones(512, dtype=np.float32)
+    success, message = repo.add_student_with_photos(
+        name="Dana Example",
+        roll_number="CS004",
+        email="dana@example.com",
+        phone="",
+        course="Computer Science",
+        embeddings_data=[("photo-1", embedding), ("photo-2", embedding)],
+    )
+    assert success, message
+    listed = repo.get_all_students()[0]
+
+    assert repo.get_student(listed["id"]) == listed
+    assert repo.get_student(listed["id"])["photo_count"] == 2
+
+    repo.delete_student(listed["id"])
+    assert repo.get_student(listed["id"]) is None
+
+
+def test_embedding_matrix_is_contiguous_and_normalized(tmp_path, monkeypatch):
+    db_file = tmp_path / "attendance.db"
+    monkeypatch.setattr(db_connection, "DB_FILE", db_file)
+
+    init_database()
+
+    repo = StudentRepository()
+    for roll, scale in (("CS005", 2.0), ("CS006", 3.0)):
+        success, message = repo.add_student_with_photos(
+            name=f"Student {roll}",
+            roll_number=roll,
+            email=f"{roll.lower()}@example.com",
+            phone="",
+            course="Computer Science",
+            embeddings_data=[(f"{roll}-1", np.full(512, scale, dtype=np.float32)),
+                             (f"{roll}-2", np.arange(512, dtype=np.float32))],
+        )
+        assert success, message
+
+    matrix, ids, metadata = repo.get_embedding_matrix()
+    rows = repo.get_student_embeddings()
+
+    assert matrix.shape == (4, 512) and matrix.dtype == np.float32
+    assert matrix.flags["C_CONTIGUOUS"]
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+    assert sorted(ids.tolist()) == sorted(row[0] for row in rows)
+    assert set(metadata.values()) == {("Student CS005", "CS005"), ("Student CS006", "CS006")}
+
+
+def test_search_matches_substrings_case_insensitively(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_connection, "DB_FILE", tmp_path / "attendance.db")
+    init_database()
+
+    repo = StudentRepository()
+    embedding = np.ones(512, dtype=np.float32)
+    for name, roll, email in [
+        ("Erin Example", "CS_005", "erin@example.com"),
+        ("Frank Sample", "CS006", None),
+        ("Gail 100% Real", "EE007", "gail@test.org"),
+    ]:
+        success, message = repo.add_student_with_photos(
+            name=name,
+            roll_number=roll,
+            email=email,
+            phone="",
+            course="Computer Science",
+            embeddings_data=[(f"photo-{roll}", embedding)],
+        )
+        assert success, message
+
+    assert [s["name"] for s in repo.search("AMPLE")] == ["Erin Example", "Frank Sample"]
+    assert [s["roll_number"] for s in repo.search("cs_")] == ["CS_005"]
+    assert [s["name"] for s in repo.search("test.org")] == ["Gail 100% Real"]
+    assert [s["name"] for s in repo.search("0%")] == ["Gail 100% Real"]
+    assert repo.search("Erin")[0] == repo.get_student(repo.search("Erin")[0]["id"])
+
+    repo.delete_student(repo.search("Frank")[0]["id"])
+    assert repo.search("frank") == []
+
+
+def test_get_by_course_filters_case_insensitively_with_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_connection, "DB_FILE", tmp_path / "attendance.db")
+    init_database()
+
+    repo = StudentRepository()
+    embedding = np.ones(512, dtype=np.float32)
+    for name, roll, course in [("Hana", "CS008", "Computer Science"), ("Ivan", "EE009", "EE"), ("Jo", "CS010", "computer science")]:
+        success, message = repo.add_student_with_photos(
+            name=name,
+            roll_number=roll,
+            email=None,
+            phone="",
+            course=course,
+            embeddings_data=[(f"photo-{roll}", embedding)],
+        )
+        assert success, message
+
+    assert [s["name"] for s in repo.get_by_course("COMPUTER SCIENCE")] == ["Hana", "Jo"]
+    assert repo.get_by_course("Mechanical") == []
+
+    with get_db_connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM students WHERE lower(course) = lower(?)", ("ee",)
+        ).fetchall()
+    assert any("idx_students_course_ci" in row[3] for row in plan)
+
+
+def test_embeddings_version_changes_with_roster(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_connection, "DB_FILE", tmp_path / "attendance.db")
+    init_database()
+
+    repo = StudentRepository()
+    embedding = np.ones(512, dtype=np.float32)
+    empty = repo.get_embeddings_version()
+    assert empty == (0, 0, 0)
+
+    for roll in ("CS011", "CS012"):
+        success, message = repo.add_student_with_photos(
+            name=f"Student {roll}",
+            roll_number=roll,
+            email=None,
+            phone="",
+            course="Computer Science",
+            embeddings_data=[(f"photo-{roll}", embedding)],
+        )
+        assert success, message
+    enrolled = repo.get_embeddings_version()
+    assert enrolled[0] == 2
+    assert repo.get_embeddings_version() == enrolled
+
+    success, message = repo.delete_student_by_roll("CS011")
+    assert success, message
+    assert repo.get_embeddings_version() not in (empty, enrolled)
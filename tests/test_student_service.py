@@ -0,0 +1,204 @@
+"""Student service lookup tests against a seeded SQLite database."""
+
+import threading
+
+import numpy as np
+import pytest
+
+import database.connection as db_connection
+import face_recognition.recognition_engine as recognition_engine
+from database.connection import init_database
+from services.student_service import StudentService
+
+
+def _add_student(service, name, roll, course):
+    success, message = service.student_repo.add_student_with_photos(
+        name=name,
+        roll_number=roll,
+        email=f"{roll.lower()}@example.com",
+        phone="",
+        course=course,
+        embeddings_data=[(f"photo-{roll}", np.ones(512, dtype=np.float32))],
+    )
+    assert success, message
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_connection, "DB_FILE", tmp_path / "attendance.db")
+    init_database()
+    return StudentService()
+
+
+def test_lookups_do_not_load_all_students(service, monkeypatch):
+    _add_student(service, "Alice", "CS001", "CSE")
+    _add_student(service, "Bob", "EE001", "EE")
+    calls = []
+    original = service.student_repo.get_all_students
+
+    def counting_get_all_students():
+        calls.append(1)
+        return original()
+
+    monkeypatch.setattr(service.student_repo, "get_all_students", counting_get_all_students)
+
+    alice = service.search_students("alice")[0]
+    assert service.get_student_by_id(alice["id"])["roll_number"] == "CS001"
+    assert [s["name"] for s in service.get_students_by_course("ee")] == ["Bob"]
+    assert service.get_student_statistics()["by_course"] == {"CSE": 1, "EE": 1}
+    assert calls == []
+
+
+def test_statistics_match_between_sql_and_warm_snapshot(service):
+    _add_student(service, "Alice", "CS001", "CSE")
+    _add_student(service, "Bob", "EE001", "EE")
+    _add_student(service, "Cara", "CS002", "CSE")
+    success, message = service.student_repo.add_student_with_photos(
+        name="Dan", roll_number="ME001", email=None, phone="", course="ME", embeddings_data=[]
+    )
+    assert success, message
+
+    from_sql = service.get_student_statistics()
+    service.search_students("")  # warms the snapshot
+    from_snapshot = service.get_student_statistics()
+
+    assert from_sql == from_snapshot == {
+        "total_students": 4,
+        "by_course": {"CSE": 2, "EE": 1, "ME": 1},
+        "with_photos": 3,
+        "without_photos": 1,
+    }
+
+
+def test_delete_invalidates_students_snapshot(service):
+    _add_student(service, "Alice", "CS001", "CSE")
+    assert service.get_student_statistics()["total_students"] == 1
+
+    success, message = service.delete_student_by_roll("CS001")
+
+    assert success, message
+    assert service.get_student_statistics()["total_students"] == 0
+
+
+def test_get_student_by_id_uses_primary_key_lookup(service, monkeypatch):
+    _add_student(service, "Alice", "CS001", "CSE")
+    alice = service.student_repo.get_all_students()[0]
+
+    def unexpected():
+        raise AssertionError("full student scan not expected")
+
+    monkeypatch.setattr(service.student_repo, "get_all_students", unexpected)
+
+    assert service.get_student_by_id(alice["id"]) == alice
+    assert service.get_student_by_id(alice["id"] + 100) is None
+
+
+def test_get_student_by_id_finds_students_added_elsewhere(service):
+    _add_student(service, "Alice", "CS001", "CSE")
+    service.search_students("")  # warms the snapshot
+
+    other = StudentService()
+    _add_student(other, "Bob", "EE001", "EE")
+    bob = other.student_repo.search("EE001")[0]
+
+    assert service.get_student_by_id(bob["id"])["name"] == "Bob"
+
+
+def test_students_snapshot_drops_on_writes_from_other_services(service):
+    _add_student(service, "Alice", "CS001", "CSE")
+    assert [s["name"] for s in service.get_all_students()] == ["Alice"]
+
+    other = StudentService()
+    _add_student(other, "Bob", "EE001", "EE")
+    assert sorted(s["name"] for s in service.get_all_students()) == ["Alice", "Bob"]
+
+    assert other.delete_student_by_roll("CS001")[0]
+    assert [s["name"] for s in service.get_all_students()] == ["Bob"]
+
+
+def test_recognition_reuses_gallery_until_enrolment_changes(service, monkeypatch):
+    _add_student(service, "Alice", "CS001", "CSE")
+    loads = []
+    original_load = service.student_repo.get_embedding_matrix
+
+    def counting_load():
+        loads.append(1)
+        return original_load()
+
+    monkeypatch.setattr(service.student_repo, "get_embedding_matrix", counting_load)
+    monkeypatch.setattr(
+        service.face_engine, "generate_embedding",
+        lambda image, debug_mode=False: np.ones(512, dtype=np.float32),
+    )
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+
+    first = service.recognize_student(image)
+    second = service.recognize_student(image)
+    assert first[0] and second[0]
+    assert first[1]["roll_number"] == "CS001"
+    # The debug comparison view scores against the same warm gallery
+    assert service.get_recognition_gallery().students == [("Alice", "CS001")]
+    assert len(loads) == 1
+
+    service.delete_student_by_roll("CS001")
+    assert service.recognize_student(image)[3]["reason"] == "no_gallery"
+    assert len(loads) == 2
+
+
+def test_cold_gallery_loads_alongside_probe_embedding(service, monkeypatch):
+    _add_student(service, "Alice", "CS001", "CSE")
+    threads = {}
+    original_load = service.student_repo.get_embedding_matrix
+
+    def recording_load():
+        threads["gallery"] = threading.current_thread()
+        return original_load()
+
+    def recording_embedding(image, debug_mode=False):
+        threads["probe"] = threading.current_thread()
+        return np.ones(512, dtype=np.float32)
+
+    monkeypatch.setattr(service.student_repo, "get_embedding_matrix", recording_load)
+    monkeypatch.setattr(service.face_engine, "generate_embedding", recording_embedding)
+
+    is_recognized, info, _, _ = service.recognize_student(np.zeros((64, 64, 3), dtype=np.uint8))
+
+    assert is_recognized and info["roll_number"] == "CS001"
+    assert threads["probe"] is threading.main_thread()
+    assert threads["gallery"] is not threading.main_thread()
+
+
+def test_face_engine_is_shared_and_created_on_first_use(service, monkeypatch):
+    monkeypatch.setattr(recognition_engine, "_face_engine", None)
+    warmups = []
+    monkeypatch.setattr(
+        recognition_engine.FaceRecognitionEngine, "_initialize_models", lambda self: warmups.append(self)
+    )
+
+    other = StudentService()
+    _add_student(service, "Alice", "CS001", "CSE")
+    service.search_students("alice")
+    service.get_student_statistics()
+    assert warmups == []
+
+    assert service.face_engine is other.face_engine
+    assert len(warmups) == 1
+
+
+def test_returned_students_do_not_alias_the_snapshot(service, monkeypatch):
+    _add_student(service, "Alice", "CS001", "CSE")
+    _add_student(service, "Bob", "EE001", "EE")
+    students = service.get_all_students()
+    monkeypatch.setattr(
+        service.student_repo, "get_all_students",
+        lambda: pytest.fail("snapshot should be reused"),
+    )
+
+    students.pop()
+    students[0]["name"] = "Mallory"
+    service.get_student_by_id(students[0]["id"])["course"] = "XX"
+    service.search_students("").clear()
+
+    assert [s["name"] for s in service.get_all_students()] == ["Alice", "Bob"]
+    assert service.get_student_by_id(students[0]["id"])["course"] == "CSE"
+    assert service.get_student_statistics()["by_course"] == {"CSE": 1, "EE": 1}
@@ -0,0 +1,29 @@
+"""Input validators used by the signup and student forms."""
+
+from auth.validators import validate_email, validate_password, validate_username
+
+
+def test_validate_email():
+    assert validate_email("student@example.com")
+    assert validate_email("  student@example.com  ")
+    assert not validate_email("student@example")
+    assert not validate_email("")
+    assert not validate_email(None)
+
+
+def test_validate_username_messages():
+    assert validate_username("ada_99") == (True, "Username is valid")
+    assert validate_username("ab") == (False, "Username must be at least 3 characters long")
+    assert validate_username("bad name")[0] is False
+    assert validate_username(None) == (False, "Username is required")
+
+
+def test_validators_are_memoized_but_password_is_not_cached():
+    validate_email.cache_clear()
+    validate_email("repeat@example.com")
+    validate_email("repeat@example.com")
+    assert validate_email.cache_info().hits == 1
+
+    assert validate_password("abc123")[0] is True
+    assert validate_password("123456") == (False, "Password must contain at least one letter")
+    assert not hasattr(validate_password, "cache_info")
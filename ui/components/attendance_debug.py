@@ -4,19 +4,68 @@ Debug tools for face recognition during attendance marking
 """
 import streamlit as st
 import numpy as np
+import pandas as pd
 import cv2
+from functools import cached_property
 from typing import List, Dict, Tuple, Optional
-from face_recognition.recognition_engine import FaceRecognitionEngine
+from face_recognition.recognition_engine import (
+    EmbeddingGallery,
+    FaceRecognitionEngine,
+    gallery_from_arrays,
+    gallery_similarities,
+    get_face_engine,
+)
+from face_recognition.image_utils import get_face_cascade
 from services.student_service import StudentService
 from services.attendance_service import AttendanceService
 
+# Best-matching templates listed by the student comparison step
+TOP_MATCHES = 10
+
+# Square input side of each recognition model; larger face crops are shrunk to it up front
+MODEL_INPUT_SIDES = {'ArcFace': 112, 'Facenet': 160, 'Facenet512': 160}
+
+# Longest side (px) frames are shrunk to before Haar detection
+DETECTION_MAX_SIDE = 640
+
+
+def _detect_faces(gray, min_size: Optional[Tuple[int, int]] = None):
+    """Haar face boxes (x, y, w, h) in full-resolution coordinates.
+    
+    Frames larger than DETECTION_MAX_SIDE are detected on a downscaled copy
+    with a coarser pyramid, then the boxes are scaled back up.
+    """
+    scale = DETECTION_MAX_SIDE / max(gray.shape[:2])
+    if scale >= 1.0:
+        kwargs = {'minSize': min_size} if min_size else {}
+        return get_face_cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, **kwargs)
+    
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    kwargs = {'minSize': tuple(max(1, round(side * scale)) for side in min_size)} if min_size else {}
+    faces = get_face_cascade().detectMultiScale(small, scaleFactor=1.2, minNeighbors=5, **kwargs)
+    if len(faces) == 0:
+        return faces
+    return np.round(np.asarray(faces) / scale).astype(int)
+
 class AttendanceDebugger:
     """Debug component for attendance recognition issues"""
     
     def __init__(self):
-        self.face_engine = FaceRecognitionEngine()
-        self.student_service = StudentService()
-        self.attendance_service = AttendanceService()
+        # (embeddings version, normalized gallery) reused until the roster changes
+        self._known_embeddings: Optional[Tuple[Tuple[int, int, int], EmbeddingGallery]] = None
+    
+    # Dependencies are created on first use so importing this module stays cheap
+    @cached_property
+    def face_engine(self) -> FaceRecognitionEngine:
+        return get_face_engine()
+    
+    @cached_property
+    def student_service(self) -> StudentService:
+        return StudentService()
+    
+    @cached_property
+    def attendance_service(self) -> AttendanceService:
+        return AttendanceService()
     
     def debug_recognition_failure(self, image) -> Dict:
         """Debug why face recognition failed"""
@@ -29,17 +78,41 @@ class AttendanceDebugger:
         }
         
         try:
+            # Grayscale is shared by the steps below; each step reports its own conversion error
+            try:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            except Exception:
+                gray = None
+            
             # 1. Analyze input image
-            debug_info['image_analysis'] = self._analyze_input_image(image)
+            debug_info['image_analysis'] = self._analyze_input_image(image, gray)
             
             # 2. Test face detection
-            debug_info['face_detection'] = self._test_face_detection(image)
-            
-            # 3. Test embedding generation
-            debug_info['embedding_generation'] = self._test_embedding_generation(image)
-            
-            # 4. Compare with registered students
-            debug_info['student_comparison'] = self._test_student_comparison(image)
+            debug_info['face_detection'] = self._test_face_detection(image, gray)
+            
+            # 3. Test embedding generation, reusing step 2's face boxes for the crop fallback
+            face_detection = debug_info['face_detection']
+            faces = None if 'error' in face_detection else face_detection['face_regions']
+            debug_info['embedding_generation'] = self._test_embedding_generation(image, gray, faces)
+            
+            # 4. Compare with registered students; without an embedding from step 3 a second
+            # attempt would fail the same way, so only count the gallery and skip the scoring
+            best_embedding = debug_info['embedding_generation'].get('best_embedding')
+            if best_embedding is None:
+                from database.student_repository import StudentRepository
+                debug_info['student_comparison'] = {
+                    'error': "No embedding available",
+                    'skipped': True,
+                    'total_students': StudentRepository().get_embeddings_version()[0],
+                    'comparisons_made': 0,
+                    'best_match': None,
+                    'all_similarities': [],
+                    'threshold_used': self.face_engine.recognition_threshold
+                }
+            else:
+                debug_info['student_comparison'] = self._test_student_comparison(
+                    image, precomputed_embedding=best_embedding
+                )
             
             # 5. Generate recommendations
             debug_info['recommendations'] = self._generate_recommendations(debug_info)
@@ -49,7 +122,7 @@ class AttendanceDebugger:
         
         return debug_info
     
-    def _analyze_input_image(self, image) -> Dict:
+    def _analyze_input_image(self, image, gray=None) -> Dict:
         """Analyze the input image quality"""
         try:
             analysis = {
@@ -62,23 +135,24 @@ class AttendanceDebugger:
             
             if image is not None:
                 # Convert to grayscale for analysis
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                
-                # Brightness analysis
-                analysis['brightness'] = np.mean(gray)
+                if gray is None:
+                    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
                 
-                # Contrast analysis
-                analysis['contrast'] = np.std(gray)
+                # Brightness and contrast in one pass
+                mean, std = cv2.meanStdDev(gray)
+                analysis['brightness'] = float(mean[0, 0])
+                analysis['contrast'] = float(std[0, 0])
                 
-                # Blur detection using Laplacian variance
-                analysis['blur_score'] = cv2.Laplacian(gray, cv2.CV_64F).var()
+                # Blur detection using Laplacian variance; int16 holds the 3x3 response of uint8 input exactly
+                _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+                analysis['blur_score'] = float(lap_std[0, 0]) ** 2
             
             return analysis
             
         except Exception as e:
             return {'error': str(e)}
     
-    def _test_face_detection(self, image) -> Dict:
+    def _test_face_detection(self, image, gray=None) -> Dict:
         """Test face detection with multiple methods"""
         detection_results = {
             'opencv_detection': False,
@@ -89,9 +163,9 @@ class AttendanceDebugger:
         
         try:
             # Test OpenCV face detection
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(50, 50))
+            if gray is None:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            faces = _detect_faces(gray, min_size=(50, 50))
             
             detection_results['opencv_detection'] = len(faces) > 0
             detection_results['face_count'] = len(faces)
@@ -110,8 +184,8 @@ class AttendanceDebugger:
         
         return detection_results
     
-    def _test_embedding_generation(self, image) -> Dict:
-        """Test embedding generation with different approaches"""
+    def _test_embedding_generation(self, image, gray=None, faces=None) -> Dict:
+        """Test embedding generation with different approaches (faces: boxes already detected, if any)"""
         embedding_results = {
             'standard_approach': False,
             'skip_detection_approach': False,
@@ -129,46 +203,58 @@ class AttendanceDebugger:
                 is_valid, msg = self.face_engine.validate_embedding_quality(embedding)
                 embedding_results['embedding_quality'] = {'valid': is_valid, 'message': msg}
             
-            # If standard failed, try other approaches
+            # If standard failed, embed the whole frame and the Haar face crop (both without
+            # detection) in a single batched forward pass
             if not embedding_results['standard_approach']:
-                # Try skip detection
+                batch = [image]
                 try:
-                    from deepface import DeepFace
-                    result = DeepFace.represent(
-                        img_path=image,
-                        model_name='ArcFace',
-                        detector_backend='skip',
-                        enforce_detection=False
-                    )
-                    if result:
-                        embedding_results['skip_detection_approach'] = True
-                except:
-                    pass
-                
-                # Try with OpenCV face crop
-                try:
-                    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-                    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+                    if faces is None:
+                        if gray is None:
+                            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+                        faces = _detect_faces(gray)
                     
                     if len(faces) > 0:
                         x, y, w, h = faces[0]
                         face_crop = image[y:y+h, x:x+w]
-                        crop_embedding = self.face_engine.generate_embedding(face_crop, debug_mode=True)
-                        if crop_embedding is not None:
-                            embedding_results['opencv_crop_approach'] = True
-                            if embedding_results['best_embedding'] is None:
-                                embedding_results['best_embedding'] = crop_embedding
-                except:
+                        side = MODEL_INPUT_SIDES.get(self.face_engine.model_name)
+                        if side and min(face_crop.shape[:2]) > side:
+                            face_crop = cv2.resize(face_crop, (side, side), interpolation=cv2.INTER_AREA)
+                        batch.append(face_crop)
+                except Exception:
                     pass
+                
+                try:
+                    embeddings = self.face_engine.generate_embeddings_without_detection(batch)
+                except Exception:
+                    embeddings = [None] * len(batch)
+                
+                embedding_results['skip_detection_approach'] = embeddings[0] is not None
+                crop_embedding = embeddings[1] if len(embeddings) > 1 else None
+                if crop_embedding is not None:
+                    embedding_results['opencv_crop_approach'] = True
+                    embedding_results['best_embedding'] = crop_embedding
+                    is_valid, msg = self.face_engine.validate_embedding_quality(crop_embedding)
+                    embedding_results['embedding_quality'] = {'valid': is_valid, 'message': msg}
         
         except Exception as e:
             embedding_results['error'] = str(e)
         
         return embedding_results
     
-    def _test_student_comparison(self, image) -> Dict:
-        """Test comparison with all registered students"""
+    def _get_known_embeddings(self, student_repo) -> EmbeddingGallery:
+        """Normalized (int8 too, when recognition uses it) embeddings of all registered students.
+        
+        Rebuilt only when the roster changes.
+        """
+        version = student_repo.get_embeddings_version()
+        if self._known_embeddings is None or self._known_embeddings[0] != version:
+            self._known_embeddings = (version, gallery_from_arrays(
+                *student_repo.get_embedding_matrix(), quantize=self.face_engine.use_int8_gallery
+            ))
+        return self._known_embeddings[1]
+    
+    def _test_student_comparison(self, image, precomputed_embedding: Optional[np.ndarray] = None) -> Dict:
+        """Test comparison with all registered students (reuses precomputed_embedding when given)"""
         comparison_results = {
             'total_students': 0,
             'comparisons_made': 0,
@@ -181,49 +267,45 @@ class AttendanceDebugger:
             # Get all student embeddings
             from database.student_repository import StudentRepository
             student_repo = StudentRepository()
-            student_embeddings = student_repo.get_student_embeddings()
+            known = self._get_known_embeddings(student_repo)
             
-            comparison_results['total_students'] = len(student_embeddings)
+            comparison_results['total_students'] = len(known.matrix)
             
-            if len(student_embeddings) == 0:
+            if len(known.matrix) == 0:
                 comparison_results['error'] = "No students registered in the system"
                 return comparison_results
             
-            # Generate embedding for input image
-            input_embedding = self.face_engine.generate_embedding(image, debug_mode=True)
+            # Generate embedding for input image unless step 3 already produced one
+            input_embedding = precomputed_embedding
+            if input_embedding is None:
+                input_embedding = self.face_engine.generate_embedding(image, debug_mode=True)
             
             if input_embedding is None:
                 comparison_results['error'] = "Could not generate embedding for input image"
                 return comparison_results
             
-            # Compare with all students
-            similarities = []
+            # Compare with all students in one matrix-vector product, scored exactly as recognition does
+            sims = gallery_similarities(known, input_embedding)
             
-            for student_id, name, roll_number, known_embedding in student_embeddings:
-                try:
-                    similarity = self.face_engine.cosine_similarity(input_embedding, known_embedding)
-                    similarities.append({
-                        'student_id': student_id,
-                        'name': name,
-                        'roll_number': roll_number,
-                        'similarity': similarity
-                    })
-                    comparison_results['comparisons_made'] += 1
-                except Exception as e:
-                    similarities.append({
-                        'student_id': student_id,
-                        'name': name,
-                        'roll_number': roll_number,
-                        'similarity': 0.0,
-                        'error': str(e)
-                    })
-            
-            # Sort by similarity
-            similarities.sort(key=lambda x: x['similarity'], reverse=True)
-            comparison_results['all_similarities'] = similarities
+            comparison_results['comparisons_made'] = len(sims)
+            
+            # Only the best TOP_MATCHES rows are shown; select them in O(N) and sort just those
+            k = min(TOP_MATCHES, len(sims))
+            top = np.argpartition(-sims, k - 1)[:k]
+            top = top[np.argsort(-sims[top], kind='stable')]
             
-            if similarities:
-                comparison_results['best_match'] = similarities[0]
+            similarities = []
+            for row in top.tolist():
+                student_index = known.row_student[row]
+                name, roll_number = known.students[student_index]
+                similarities.append({
+                    'student_id': int(known.student_ids[student_index]),
+                    'name': name,
+                    'roll_number': roll_number,
+                    'similarity': float(sims[row])
+                })
+            comparison_results['all_similarities'] = similarities
+            comparison_results['best_match'] = similarities[0]
             
         except Exception as e:
             comparison_results['error'] = str(e)
@@ -413,6 +495,11 @@ class AttendanceDebugger:
     
     def _render_student_comparison_tab(self, comparison: Dict):
         """Render student comparison tab"""
+        if comparison.get('skipped'):
+            st.warning("⚠️ Comparison skipped - no embedding could be generated for this image")
+            st.metric("Total Students", comparison.get('total_students', 0))
+            return
+        
         if 'error' in comparison:
             st.error(f"❌ Comparison error: {comparison['error']}")
             return
@@ -442,17 +529,18 @@ class AttendanceDebugger:
         if similarities:
             st.markdown("**All Student Similarities:**")
             
-            similarity_data = []
-            for sim in similarities[:10]:  # Show top 10
-                similarity_data.append({
-                    'Name': sim.get('name'),
-                    'Roll': sim.get('roll_number'),
-                    'Similarity': f"{sim.get('similarity', 0):.3f}",
-                    'Status': '✅ Match' if sim.get('similarity', 0) >= comparison.get('threshold_used', 0.6) else '❌ No Match'
-                })
-            
-            if similarity_data:
-                st.dataframe(similarity_data, use_container_width=True, hide_index=True)
+            df = pd.DataFrame.from_records(
+                similarities[:TOP_MATCHES], columns=['name', 'roll_number', 'similarity']
+            ).rename(columns={'name': 'Name', 'roll_number': 'Roll', 'similarity': 'Similarity'})
+            df['Status'] = np.where(
+                df['Similarity'] >= comparison.get('threshold_used', 0.6), '✅ Match', '❌ No Match'
+            )
+            st.dataframe(
+                df,
+                use_container_width=True,
+                hide_index=True,
+                column_config={'Similarity': st.column_config.NumberColumn('Similarity', format="%.3f")}
+            )
 
 # Global instance
 attendance_debugger = AttendanceDebugger()
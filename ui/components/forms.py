@@ -2,10 +2,27 @@
 Reusable form components
 Extracted from app.py form creation functions
 """
+import cv2
+import numpy as np
 import streamlit as st
 from typing import Dict, List, Optional, Tuple, Any
 from auth.validators import validate_email, validate_password, validate_username
 
+# Courses offered by the student and filter forms (module-level so reruns reuse them)
+FORM_COURSES = ("CSE", "CE", "EE", "BE", "ME")
+COURSE_FILTER_OPTIONS = ("All Courses",) + FORM_COURSES
+
+
+@st.cache_data(show_spinner=False)
+def _build_student_labels(students_key: Tuple[Tuple[str, str], ...]) -> Tuple[str, ...]:
+    """Student filter labels ("All Students" first), memoized on the (name, roll_number) tuples"""
+    return ("All Students",) + tuple(f"{name} ({roll_number})" for name, roll_number in students_key)
+
+
+def _decode_bgr(image_file) -> Optional[np.ndarray]:
+    """Decode an uploaded/captured image straight from its buffer to a BGR array (None if undecodable)"""
+    return cv2.imdecode(np.frombuffer(image_file.getvalue(), np.uint8), cv2.IMREAD_COLOR)
+
 class LoginForm:
     """Login form component"""
     
@@ -53,22 +70,14 @@ class SignupForm:
             signup_clicked = st.form_submit_button("✨ Create Account", use_container_width=True)
         
         if signup_clicked:
-            # Validate inputs
-            errors = []
-            
-            if not validate_email(email):
-                errors.append("Invalid email format")
-            
-            username_valid, username_msg = validate_username(username)
-            if not username_valid:
-                errors.append(username_msg)
-            
-            password_valid, password_msg = validate_password(password)
-            if not password_valid:
-                errors.append(password_msg)
-            
-            if password != confirm_password:
-                errors.append("Passwords do not match")
+            # Validate inputs: (passed, message) per check, in display order
+            checks = (
+                (validate_email(email), "Invalid email format"),
+                validate_username(username),
+                validate_password(password),
+                (password == confirm_password, "Passwords do not match"),
+            )
+            errors = [message for passed, message in checks if not passed]
             
             if errors:
                 for error in errors:
@@ -104,7 +113,7 @@ class StudentForm:
             with col2:
                 phone = st.text_input("Phone", placeholder="Enter phone number")
                 course = st.selectbox("Course", 
-                                    ["CSE", "CE", "EE", "BE", "ME"], 
+                                    FORM_COURSES, 
                                     help="Select the student's course")
             
             st.markdown("### 📷 Upload Student Photos")
@@ -155,8 +164,8 @@ class AttendanceForm:
     """Attendance marking form component"""
     
     @staticmethod
-    def render_camera_input() -> Optional[Any]:
-        """Render camera input for attendance"""
+    def render_camera_input() -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """Render camera input for attendance; returns (camera file, decoded BGR image)"""
         st.subheader("📷 Mark Attendance")
         st.caption(
             "YOLO checks the captured photo for a face mask. Remove your mask before taking the picture — masked faces are blocked."
@@ -171,11 +180,13 @@ class AttendanceForm:
             if camera_input is not None:
                 st.image(camera_input, caption="Captured Image", width=200)
         
-        return camera_input
+        if camera_input is None:
+            return None, None
+        return camera_input, _decode_bgr(camera_input)
     
     @staticmethod
-    def render_file_upload() -> Optional[Any]:
-        """Render file upload for attendance"""
+    def render_file_upload() -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """Render file upload for attendance; returns (uploaded file, decoded BGR image)"""
         st.subheader("📁 Upload Photo for Attendance")
         
         uploaded_file = st.file_uploader(
@@ -187,7 +198,9 @@ class AttendanceForm:
         if uploaded_file is not None:
             st.image(uploaded_file, caption="Uploaded Image", width=300)
         
-        return uploaded_file
+        if uploaded_file is None:
+            return None, None
+        return uploaded_file, _decode_bgr(uploaded_file)
 
 class FilterForm:
     """Reusable filter form for data display"""
@@ -211,23 +224,25 @@ class FilterForm:
             st.warning("No students available")
             return None
         
-        student_options = {f"{s['name']} ({s['roll_number']})": s['id'] for s in students}
-        selected_option = st.selectbox(
+        labels = _build_student_labels(tuple((s['name'], s['roll_number']) for s in students))
+        # Options are positions (0 = all students), so no label -> id lookup is needed
+        selected = st.selectbox(
             "Select Student",
-            options=["All Students"] + list(student_options.keys())
+            options=range(len(labels)),
+            format_func=labels.__getitem__
         )
         
-        if selected_option == "All Students":
+        if selected == 0:
             return None
         else:
-            return student_options[selected_option]
+            return students[selected - 1]['id']
     
     @staticmethod
     def render_course_filter() -> Optional[str]:
         """Render course selection filter"""
         course = st.selectbox(
             "Filter by Course",
-            options=["All Courses", "CSE", "CE", "EE", "BE", "ME"]
+            options=COURSE_FILTER_OPTIONS
         )
         
         return None if course == "All Courses" else course
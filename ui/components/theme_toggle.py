@@ -3,9 +3,238 @@ Theme toggle component - WORKING VERSION
 Provides dark/light theme switching functionality using Streamlit's native features
 """
 
+import re
+from functools import lru_cache
 import streamlit as st
 from typing import Optional
 
+
+def _minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet (run once at import)"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{}:;,])\s*", r"\1", css).strip()
+
+
+# Theme stylesheets, built once at import. Streamlit drops any element a rerun does not
+# re-emit, so they are still written on every rerun - only the strings are shared.
+# Rules that do not depend on the theme (layout, shape, var() colours) live in _BASE_CSS;
+# the theme blocks carry only the palette and the declarations that differ between themes.
+_BASE_CSS = """
+<style>
+/* Main App Background */
+.stApp {
+    color: var(--text-primary) !important;
+}
+
+/* Main Content Area */
+.main .block-container {
+    border: 1px solid var(--border-color) !important;
+    border-radius: 12px !important;
+    backdrop-filter: blur(10px) !important;
+}
+
+/* Sidebar Styling */
+section[data-testid="stSidebar"] {
+    border-right: 1px solid var(--border-color) !important;
+}
+
+section[data-testid="stSidebar"] > div {
+    background: transparent !important;
+}
+
+/* Input Fields */
+.stTextInput > div > div > input,
+.stTextArea > div > div > textarea,
+.stSelectbox > div > div > select,
+.stNumberInput > div > div > input {
+    color: var(--text-primary) !important;
+    border-color: var(--border-color) !important;
+    border-radius: 8px !important;
+}
+
+/* Buttons */
+.stButton > button {
+    color: var(--text-primary) !important;
+    border: 1px solid var(--border-color) !important;
+    border-radius: 8px !important;
+    transition: all 0.3s ease !important;
+}
+
+.stButton > button:hover {
+    background: var(--accent-color) !important;
+    transform: translateY(-2px) !important;
+    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3) !important;
+}
+
+/* Primary Button */
+.stButton > button[kind="primary"] {
+    background: var(--accent-color) !important;
+    color: white !important;
+    border: none !important;
+}
+
+/* Metrics */
+[data-testid="metric-container"] {
+    background: var(--bg-secondary) !important;
+    border: 1px solid var(--border-color) !important;
+    border-radius: 8px !important;
+    padding: 12px !important;
+}
+
+/* Dataframes */
+.stDataFrame {
+    border-radius: 8px !important;
+}
+
+/* Headers */
+h1, h2, h3, h4, h5, h6 {
+    color: var(--text-primary) !important;
+}
+
+/* Success/Error Messages */
+.stAlert {
+    border-radius: 8px !important;
+}
+
+/* Tabs */
+.stTabs [data-baseweb="tab-list"] {
+    background: var(--bg-secondary) !important;
+}
+
+.stTabs [data-baseweb="tab"] {
+    color: var(--text-secondary) !important;
+}
+
+.stTabs [aria-selected="true"] {
+    color: var(--accent-color) !important;
+}
+</style>
+"""
+
+_DARK_CSS = """
+<style>
+/* Dark Theme Variables */
+:root {
+    --bg-primary: #0f172a;
+    --bg-secondary: #1e293b;
+    --bg-tertiary: #334155;
+    --text-primary: #f8fafc;
+    --text-secondary: #cbd5e1;
+    --text-muted: #94a3b8;
+    --border-color: #475569;
+    --accent-color: #3b82f6;
+}
+
+.stApp {
+    background: linear-gradient(135deg, #0f172a 0%, #1e293b 50%, #334155 100%) !important;
+}
+
+.main .block-container {
+    background: rgba(15, 23, 42, 0.95) !important;
+    box-shadow: 0 8px 32px rgba(15, 23, 42, 0.7) !important;
+}
+
+section[data-testid="stSidebar"] {
+    background: linear-gradient(180deg, #1e293b 0%, #334155 100%) !important;
+}
+
+.stTextInput > div > div > input,
+.stTextArea > div > div > textarea,
+.stSelectbox > div > div > select,
+.stNumberInput > div > div > input,
+.stButton > button {
+    background: var(--bg-tertiary) !important;
+}
+
+.stDataFrame {
+    background: var(--bg-secondary) !important;
+}
+</style>
+"""
+
+_LIGHT_CSS = """
+<style>
+/* Light Theme Variables */
+:root {
+    --bg-primary: #ffffff;
+    --bg-secondary: #f8fafc;
+    --bg-tertiary: #f1f5f9;
+    --text-primary: #0f172a;
+    --text-secondary: #475569;
+    --text-muted: #64748b;
+    --border-color: #e2e8f0;
+    --accent-color: #3b82f6;
+}
+
+.stApp {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 50%, #f093fb 100%) !important;
+}
+
+.main .block-container {
+    background: rgba(255, 255, 255, 0.95) !important;
+    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1) !important;
+}
+
+section[data-testid="stSidebar"] {
+    background: linear-gradient(180deg, #f8fafc 0%, #f1f5f9 100%) !important;
+}
+
+/* Inputs, buttons and cards sit on white with a soft shadow */
+.stTextInput > div > div > input,
+.stTextArea > div > div > textarea,
+.stSelectbox > div > div > select,
+.stNumberInput > div > div > input,
+.stButton > button,
+.stDataFrame {
+    background: var(--bg-primary) !important;
+}
+
+.stTextInput > div > div > input,
+.stTextArea > div > div > textarea,
+.stSelectbox > div > div > select,
+.stNumberInput > div > div > input,
+.stButton > button,
+[data-testid="metric-container"] {
+    box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05) !important;
+}
+
+.stDataFrame,
+.stAlert {
+    box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1) !important;
+}
+
+.stButton > button:hover {
+    color: white !important;
+}
+
+.stTabs [data-baseweb="tab-list"] {
+    border-radius: 8px !important;
+}
+</style>
+"""
+
+# Sent on every rerun, so ship the minified form; the readable source stays above
+_BASE_CSS = _minify_css(_BASE_CSS)
+_DARK_CSS = _minify_css(_DARK_CSS)
+_LIGHT_CSS = _minify_css(_LIGHT_CSS)
+
+
+def _inject_style(css: str):
+    """Emit a <style> block, as a raw HTML element where available (Streamlit >= 1.33)"""
+    if hasattr(st, "html"):
+        st.html(css)
+    else:
+        st.markdown(css, unsafe_allow_html=True)
+
+
+# Toggle button (icon, text, type) per current theme
+_TOGGLE_VARIANTS = {
+    "light": ("🌙", "Switch to Dark Mode", "secondary"),
+    "dark": ("☀️", "Switch to Light Mode", "primary"),
+}
+
+
 class ThemeToggle:
     """Theme toggle component for dark/light mode switching"""
 
@@ -31,28 +260,22 @@ class ThemeToggle:
         new_theme = "dark" if current == "light" else "light"
         self.set_theme(new_theme)
 
-    def render_toggle_button(self, container=None) -> bool:
+    def render_toggle_button(self, container=None, key: str = "theme_toggle_btn") -> bool:
         """Render theme toggle button - WORKING VERSION"""
         current_theme = self.get_current_theme()
 
         if container is None:
             container = st
 
-        # Icons and text for button
-        if current_theme == "light":
-            icon, text = "🌙", "Switch to Dark Mode"
-            button_type = "secondary"
-        else:
-            icon, text = "☀️", "Switch to Light Mode"
-            button_type = "primary"
-
-        # Use Streamlit's native button
-        if container.button(f"{icon} {text}", key=f"theme_toggle_{id(container)}", type=button_type, use_container_width=True):
-            self.toggle_theme()
-            st.rerun()
-            return True
-        
-        return False
+        # Icons, text and type for button
+        icon, text, button_type = _TOGGLE_VARIANTS.get(current_theme, _TOGGLE_VARIANTS["dark"])
+
+        # Toggle in the click callback: it runs before the rerun the click already triggers,
+        # so the new theme's CSS is applied without a second full-script st.rerun()
+        return container.button(
+            f"{icon} {text}", key=key, type=button_type,
+            use_container_width=True, on_click=self.toggle_theme
+        )
 
     def render_sidebar_toggle(self):
         """Render theme toggle in sidebar"""
@@ -64,271 +287,44 @@ class ThemeToggle:
             
             # Radio button for theme selection
             theme_options = {"Light Mode": "light", "Dark Mode": "dark"}
-            selected_theme_name = st.radio(
+            st.radio(
                 "Choose Theme",
                 options=list(theme_options.keys()),
                 index=0 if current_theme == "light" else 1,
                 key="sidebar_theme_radio",
-                horizontal=True
+                horizontal=True,
+                on_change=lambda: self.set_theme(theme_options[st.session_state["sidebar_theme_radio"]])
             )
-            
-            selected_theme = theme_options[selected_theme_name]
-            if selected_theme != current_theme:
-                self.set_theme(selected_theme)
-                st.rerun()
 
     def render_header_toggle(self):
         """Render theme toggle in header area"""
         col1, col2, col3 = st.columns([6, 1, 1])
         with col3:
-            self.render_toggle_button()
+            self.render_toggle_button(key="theme_toggle_header")
 
     def apply_theme_css(self):
         """Apply theme-specific CSS - ENHANCED VERSION"""
-        current_theme = self.get_current_theme()
+        self._apply_theme_css(self.get_current_theme())
+
+    def _apply_theme_css(self, current_theme: str):
+        """Apply CSS for an already-resolved theme"""
+        # Theme indicator is a developer aid only (set st.session_state["theme_debug"])
+        if st.session_state.get("theme_debug"):
+            st.markdown("🌙 **Dark Theme Active**" if current_theme == "dark" else "☀️ **Light Theme Active**")
         
-        # Show theme indicator
+        _inject_style(_BASE_CSS)
         if current_theme == "dark":
-            st.markdown("🌙 **Dark Theme Active**")
             self._apply_dark_theme()
         else:
-            st.markdown("☀️ **Light Theme Active**")
             self._apply_light_theme()
 
     def _apply_dark_theme(self):
         """Enhanced dark theme CSS"""
-        dark_css = """
-        <style>
-        /* Dark Theme Variables */
-        :root {
-            --bg-primary: #0f172a;
-            --bg-secondary: #1e293b;
-            --bg-tertiary: #334155;
-            --text-primary: #f8fafc;
-            --text-secondary: #cbd5e1;
-            --text-muted: #94a3b8;
-            --border-color: #475569;
-            --accent-color: #3b82f6;
-        }
-
-        /* Main App Background */
-        .stApp {
-            background: linear-gradient(135deg, #0f172a 0%, #1e293b 50%, #334155 100%) !important;
-            color: var(--text-primary) !important;
-        }
-
-        /* Main Content Area */
-        .main .block-container {
-            background: rgba(15, 23, 42, 0.95) !important;
-            border: 1px solid var(--border-color) !important;
-            border-radius: 12px !important;
-            backdrop-filter: blur(10px) !important;
-            box-shadow: 0 8px 32px rgba(15, 23, 42, 0.7) !important;
-        }
-
-        /* Sidebar Styling */
-        section[data-testid="stSidebar"] {
-            background: linear-gradient(180deg, #1e293b 0%, #334155 100%) !important;
-            border-right: 1px solid var(--border-color) !important;
-        }
-
-        section[data-testid="stSidebar"] > div {
-            background: transparent !important;
-        }
-
-        /* Input Fields */
-        .stTextInput > div > div > input,
-        .stTextArea > div > div > textarea,
-        .stSelectbox > div > div > select,
-        .stNumberInput > div > div > input {
-            background: var(--bg-tertiary) !important;
-            color: var(--text-primary) !important;
-            border-color: var(--border-color) !important;
-            border-radius: 8px !important;
-        }
-
-        /* Buttons */
-        .stButton > button {
-            background: var(--bg-tertiary) !important;
-            color: var(--text-primary) !important;
-            border: 1px solid var(--border-color) !important;
-            border-radius: 8px !important;
-            transition: all 0.3s ease !important;
-        }
-
-        .stButton > button:hover {
-            background: var(--accent-color) !important;
-            transform: translateY(-2px) !important;
-            box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3) !important;
-        }
-
-        /* Primary Button */
-        .stButton > button[kind="primary"] {
-            background: var(--accent-color) !important;
-            color: white !important;
-            border: none !important;
-        }
-
-        /* Metrics */
-        [data-testid="metric-container"] {
-            background: var(--bg-secondary) !important;
-            border: 1px solid var(--border-color) !important;
-            border-radius: 8px !important;
-            padding: 12px !important;
-        }
-
-        /* Dataframes */
-        .stDataFrame {
-            background: var(--bg-secondary) !important;
-            border-radius: 8px !important;
-        }
-
-        /* Headers */
-        h1, h2, h3, h4, h5, h6 {
-            color: var(--text-primary) !important;
-        }
-
-        /* Success/Error Messages */
-        .stAlert {
-            border-radius: 8px !important;
-        }
-
-        /* Tabs */
-        .stTabs [data-baseweb="tab-list"] {
-            background: var(--bg-secondary) !important;
-        }
-
-        .stTabs [data-baseweb="tab"] {
-            color: var(--text-secondary) !important;
-        }
-
-        .stTabs [aria-selected="true"] {
-            color: var(--accent-color) !important;
-        }
-        </style>
-        """
-        st.markdown(dark_css, unsafe_allow_html=True)
+        _inject_style(_DARK_CSS)
 
     def _apply_light_theme(self):
         """Enhanced light theme CSS"""
-        light_css = """
-        <style>
-        /* Light Theme Variables */
-        :root {
-            --bg-primary: #ffffff;
-            --bg-secondary: #f8fafc;
-            --bg-tertiary: #f1f5f9;
-            --text-primary: #0f172a;
-            --text-secondary: #475569;
-            --text-muted: #64748b;
-            --border-color: #e2e8f0;
-            --accent-color: #3b82f6;
-        }
-
-        /* Main App Background */
-        .stApp {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 50%, #f093fb 100%) !important;
-            color: var(--text-primary) !important;
-        }
-
-        /* Main Content Area */
-        .main .block-container {
-            background: rgba(255, 255, 255, 0.95) !important;
-            border: 1px solid var(--border-color) !important;
-            border-radius: 12px !important;
-            backdrop-filter: blur(10px) !important;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1) !important;
-        }
-
-        /* Sidebar Styling */
-        section[data-testid="stSidebar"] {
-            background: linear-gradient(180deg, #f8fafc 0%, #f1f5f9 100%) !important;
-            border-right: 1px solid var(--border-color) !important;
-        }
-
-        section[data-testid="stSidebar"] > div {
-            background: transparent !important;
-        }
-
-        /* Input Fields */
-        .stTextInput > div > div > input,
-        .stTextArea > div > div > textarea,
-        .stSelectbox > div > div > select,
-        .stNumberInput > div > div > input {
-            background: var(--bg-primary) !important;
-            color: var(--text-primary) !important;
-            border-color: var(--border-color) !important;
-            border-radius: 8px !important;
-            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05) !important;
-        }
-
-        /* Buttons */
-        .stButton > button {
-            background: var(--bg-primary) !important;
-            color: var(--text-primary) !important;
-            border: 1px solid var(--border-color) !important;
-            border-radius: 8px !important;
-            transition: all 0.3s ease !important;
-            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05) !important;
-        }
-
-        .stButton > button:hover {
-            background: var(--accent-color) !important;
-            color: white !important;
-            transform: translateY(-2px) !important;
-            box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3) !important;
-        }
-
-        /* Primary Button */
-        .stButton > button[kind="primary"] {
-            background: var(--accent-color) !important;
-            color: white !important;
-            border: none !important;
-        }
-
-        /* Metrics */
-        [data-testid="metric-container"] {
-            background: var(--bg-secondary) !important;
-            border: 1px solid var(--border-color) !important;
-            border-radius: 8px !important;
-            padding: 12px !important;
-            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05) !important;
-        }
-
-        /* Dataframes */
-        .stDataFrame {
-            background: var(--bg-primary) !important;
-            border-radius: 8px !important;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1) !important;
-        }
-
-        /* Headers */
-        h1, h2, h3, h4, h5, h6 {
-            color: var(--text-primary) !important;
-        }
-
-        /* Success/Error Messages */
-        .stAlert {
-            border-radius: 8px !important;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1) !important;
-        }
-
-        /* Tabs */
-        .stTabs [data-baseweb="tab-list"] {
-            background: var(--bg-secondary) !important;
-            border-radius: 8px !important;
-        }
-
-        .stTabs [data-baseweb="tab"] {
-            color: var(--text-secondary) !important;
-        }
-
-        .stTabs [aria-selected="true"] {
-            color: var(--accent-color) !important;
-        }
-        </style>
-        """
-        st.markdown(light_css, unsafe_allow_html=True)
+        _inject_style(_LIGHT_CSS)
 
     def render_theme_selector(self):
         """Render advanced theme selector with preview"""
@@ -336,54 +332,49 @@ class ThemeToggle:
         
         current_theme = self.get_current_theme()
         
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### Choose Your Theme")
-            
-            # Theme preview cards
-            if st.button("☀️ Light Theme", key="light_theme_btn", 
-                        type="primary" if current_theme == "light" else "secondary",
-                        use_container_width=True):
-                self.set_theme("light")
-                st.rerun()
-        
-        with col2:
-            st.markdown("#### ")  # Spacing
-            
-            if st.button("🌙 Dark Theme", key="dark_theme_btn",
-                        type="primary" if current_theme == "dark" else "secondary", 
-                        use_container_width=True):
-                self.set_theme("dark")
-                st.rerun()
-
-# Global instance
-theme_toggle = ThemeToggle()
+        # One horizontal radio (as in the sidebar) instead of two columns of buttons
+        theme_options = {"☀️ Light Theme": "light", "🌙 Dark Theme": "dark"}
+        st.radio(
+            "Choose Your Theme",
+            options=list(theme_options.keys()),
+            index=0 if current_theme == "light" else 1,
+            key="theme_selector_radio",
+            horizontal=True,
+            on_change=lambda: self.set_theme(theme_options[st.session_state["theme_selector_radio"]])
+        )
+
+@lru_cache(maxsize=1)
+def _toggle() -> ThemeToggle:
+    """Shared ThemeToggle, created on first use inside a script run rather than at import"""
+    return ThemeToggle()
 
 # Convenience functions
 def init_theme():
     """Initialize and apply theme at app start"""
-    theme = theme_toggle.get_current_theme()
-    theme_toggle.apply_theme_css()
+    toggle = _toggle()
+    theme = toggle.get_current_theme()
+    toggle._apply_theme_css(theme)
     return theme
 
 def get_current_theme() -> str:
     """Get current theme"""
-    return theme_toggle.get_current_theme()
+    return _toggle().get_current_theme()
 
 def apply_theme() -> str:
     """Apply current theme and return theme name"""
-    theme_toggle.apply_theme_css()
-    return theme_toggle.get_current_theme()
+    toggle = _toggle()
+    theme = toggle.get_current_theme()
+    toggle._apply_theme_css(theme)
+    return theme
 
 def render_theme_toggle():
     """Render theme toggle button"""
-    return theme_toggle.render_toggle_button()
+    return _toggle().render_toggle_button()
 
 def render_sidebar_theme_toggle():
     """Render theme toggle in sidebar"""
-    theme_toggle.render_sidebar_toggle()
+    _toggle().render_sidebar_toggle()
 
 def render_theme_selector():
     """Render advanced theme selector"""
-    theme_toggle.render_theme_selector()
+    _toggle().render_theme_selector()
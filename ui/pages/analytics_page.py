@@ -2,18 +2,53 @@
 Analytics dashboard page - Completely redesigned
 Provides meaningful insights and visualizations for attendance data
 """
+import csv
+import io
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import logging
 from datetime import date, datetime, timedelta
-from typing import Dict, List
-from services.analytics_service import AnalyticsService
+from typing import Dict, List, Optional
+from services.analytics_service import AnalyticsService, summarize_student_performance
+from config.settings import ANALYTICS_DEFAULT_DAYS
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Scopes a widget's reruns to the decorated block (st.fragment, Streamlit >= 1.37); plain call otherwise
+_fragment = getattr(st, "fragment", lambda func: func)
+
+# Section DataFrames keyed by id() of the record list they were built from. The memoized
+# analytics dict hands back the same lists on every rerun until it is invalidated, and the
+# entry keeps its list alive, so an identity match can't be a recycled id.
+_FRAME_CACHE = TTLCache(maxsize=32, ttl=300)
+
+
+def _records_frame(records: List[Dict], date_column: Optional[str] = None) -> pd.DataFrame:
+    """DataFrame for an analytics section, built once per analytics result (treat as read-only)"""
+    hit = _FRAME_CACHE.get(id(records))
+    if hit is not None and hit[0] is records:
+        return hit[1]
+    frame = pd.DataFrame(records)
+    if date_column:
+        # Attendance dates are stored as ISO strings; naming the format skips per-element inference
+        frame[date_column] = pd.to_datetime(frame[date_column], format='ISO8601', cache=True)
+    _FRAME_CACHE.set(id(records), (records, frame))
+    return frame
+
+
+# Chart sections behind the view selector (label -> render method); Streamlit builds every
+# st.tabs panel on each rerun, so a selector is what keeps unseen figures from being built
+CHART_SECTIONS = {
+    "📈 Trends": "_render_attendance_trends",
+    "🎓 Students": "_render_student_performance",
+    "📚 Courses": "_render_course_analytics",
+    "⏰ Time Patterns": "_render_time_patterns",
+}
+
+
 class AnalyticsPage:
     """Comprehensive analytics dashboard"""
     
@@ -29,7 +64,7 @@ class AnalyticsPage:
         self._render_date_selector()
         
         # Get analytics data
-        days_back = st.session_state.get('analytics_days_back', 30)
+        days_back = st.session_state.get('analytics_days_back', ANALYTICS_DEFAULT_DAYS)
         
         with st.spinner("📈 Generating comprehensive analytics..."):
             analytics_data = self.analytics_service.get_comprehensive_analytics(days_back)
@@ -39,12 +74,9 @@ class AnalyticsPage:
             self._render_no_data_message()
             return
         
-        # Render analytics sections
+        # Render analytics sections; only the selected chart section is built and sent
         self._render_overview_section(analytics_data)
-        self._render_attendance_trends(analytics_data)
-        self._render_student_performance(analytics_data)
-        self._render_course_analytics(analytics_data)
-        self._render_time_patterns(analytics_data)
+        self._render_chart_section(analytics_data)
         self._render_alerts_section(analytics_data)
         
         # Export functionality
@@ -57,46 +89,64 @@ class AnalyticsPage:
         with col1:
             period_options = {
                 "Last 7 Days": 7,
+                "Last 14 Days": 14,
                 "Last 30 Days": 30,
                 "Last 60 Days": 60,
                 "Last 90 Days": 90,
                 "This Semester": 120
             }
+            period_days = list(period_options.values())
+            default_index = period_days.index(ANALYTICS_DEFAULT_DAYS) if ANALYTICS_DEFAULT_DAYS in period_days else 1
             
             selected_period = st.selectbox(
                 "📅 Analysis Period",
                 options=list(period_options.keys()),
-                index=1  # Default to 30 days
+                index=default_index
             )
             
             st.session_state.analytics_days_back = period_options[selected_period]
         
         with col2:
             if st.button("🔄 Refresh Data", use_container_width=True):
+                self.analytics_service.refresh_comprehensive_analytics(st.session_state.analytics_days_back)
                 st.rerun()
         
         with col3:
             st.metric("📊 Period", selected_period)
     
+    def _render_chart_section(self, analytics_data: Dict):
+        """Render the chart-heavy section picked in a horizontal selector"""
+        section = st.radio(
+            "📊 View",
+            options=list(CHART_SECTIONS.keys()),
+            key="analytics_chart_section",
+            horizontal=True,
+            label_visibility="collapsed"
+        )
+        getattr(self, CHART_SECTIONS[section])(analytics_data)
+    
     def _render_overview_section(self, analytics_data: Dict):
         """Render overview metrics section"""
         st.markdown("### 📈 Overview")
         
-        overview = analytics_data.get('overview', {})
-        weekly_summary = analytics_data.get('weekly_summary', {})
+        # Unpack every figure once (sections may be None as well as missing)
+        overview = analytics_data.get('overview') or {}
+        weekly_summary = analytics_data.get('weekly_summary') or {}
+        total_students = overview.get('total_students', 0)
+        present_today = overview.get('present_today', 0)
+        absent_today = overview.get('absent_today', 0)
+        today_rate = overview.get('attendance_rate_today', 0)
+        weekly_rate = overview.get('avg_weekly_rate', 0)
+        this_week = weekly_summary.get('this_week', 0)
+        change = weekly_summary.get('change_percent', 0)
         
         # Main metrics
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric(
-                "👥 Total Students",
-                overview.get('total_students', 0)
-            )
+            st.metric("👥 Total Students", total_students)
             
         with col2:
-            present_today = overview.get('present_today', 0)
-            absent_today = overview.get('absent_today', 0)
             st.metric(
                 "✅ Present Today",
                 present_today,
@@ -104,19 +154,13 @@ class AnalyticsPage:
             )
         
         with col3:
-            today_rate = overview.get('attendance_rate_today', 0)
-            weekly_rate = overview.get('avg_weekly_rate', 0)
-            delta_rate = today_rate - weekly_rate
             st.metric(
                 "📊 Today's Rate",
                 f"{today_rate}%",
-                delta=f"{delta_rate:+.1f}% vs avg"
+                delta=f"{today_rate - weekly_rate:+.1f}% vs avg"
             )
         
         with col4:
-            this_week = weekly_summary.get('this_week', 0)
-            last_week = weekly_summary.get('last_week', 0)
-            change = weekly_summary.get('change_percent', 0)
             st.metric(
                 "📅 This Week",
                 this_week,
@@ -145,32 +189,26 @@ class AnalyticsPage:
             return
         
         # Create DataFrame for plotting
-        trends_df = pd.DataFrame(daily_trends)
-        trends_df['date'] = pd.to_datetime(trends_df['date'])
-        
-        # Create subplots
-        fig = make_subplots(
-            rows=2, cols=1,
-            subplot_titles=['Daily Attendance Count', 'Attendance Rate (%)'],
-            vertical_spacing=0.1
-        )
+        trends_df = _records_frame(daily_trends, date_column='date')
+        
+        # One figure: count on the left axis, rate on an overlaid right axis
+        fig = go.Figure()
         
         # Attendance count line
         fig.add_trace(
-            go.Scatter(
+            go.Scattergl(
                 x=trends_df['date'],
                 y=trends_df['present_count'],
                 mode='lines+markers',
                 name='Present Count',
                 line=dict(color='#10b981', width=3),
                 marker=dict(size=6)
-            ),
-            row=1, col=1
+            )
         )
         
         # Attendance rate line
         fig.add_trace(
-            go.Scatter(
+            go.Scattergl(
                 x=trends_df['date'],
                 y=trends_df['attendance_rate'],
                 mode='lines+markers',
@@ -178,30 +216,31 @@ class AnalyticsPage:
                 line=dict(color='#3b82f6', width=3),
                 marker=dict(size=6),
                 yaxis='y2'
-            ),
-            row=2, col=1
+            )
         )
         
         # Update layout
         fig.update_layout(
             height=500,
             showlegend=True,
-            title_text="Attendance Trends Over Time"
+            title_text="Attendance Trends Over Time",
+            xaxis=dict(title="Date"),
+            yaxis=dict(title="Number of Students"),
+            yaxis2=dict(title="Percentage (%)", overlaying='y', side='right')
         )
         
-        fig.update_xaxes(title_text="Date", row=2, col=1)
-        fig.update_yaxes(title_text="Number of Students", row=1, col=1)
-        fig.update_yaxes(title_text="Percentage (%)", row=2, col=1)
-        
         st.plotly_chart(fig, use_container_width=True)
         
-        # Insights
+        # Insights: one pass over the rate array gives the extremes and their rows
+        rates = trends_df['attendance_rate'].to_numpy()
+        i_max, i_min = rates.argmax(), rates.argmin()
+        
         col1, col2 = st.columns(2)
         
         with col1:
-            avg_rate = trends_df['attendance_rate'].mean()
-            max_rate = trends_df['attendance_rate'].max()
-            min_rate = trends_df['attendance_rate'].min()
+            avg_rate = rates.mean()
+            max_rate = rates[i_max]
+            min_rate = rates[i_min]
             
             st.info(f"📊 **Average Rate:** {avg_rate:.1f}%")
             st.success(f"📈 **Highest:** {max_rate:.1f}%")
@@ -209,8 +248,8 @@ class AnalyticsPage:
         
         with col2:
             # Best and worst days
-            best_day = trends_df.loc[trends_df['attendance_rate'].idxmax()]
-            worst_day = trends_df.loc[trends_df['attendance_rate'].idxmin()]
+            best_day = trends_df.iloc[i_max]
+            worst_day = trends_df.iloc[i_min]
             
             st.success(f"🏆 **Best Day:** {best_day['day_name']} ({best_day['attendance_rate']:.1f}%)")
             st.error(f"📊 **Lowest Day:** {worst_day['day_name']} ({worst_day['attendance_rate']:.1f}%)")
@@ -226,18 +265,22 @@ class AnalyticsPage:
             st.info("📊 No student performance data available")
             return
         
-        # Performance distribution
-        performance_df = pd.DataFrame(student_performance)
+        # Performance distribution (scalars precomputed by the service)
+        performance_df = _records_frame(student_performance)
+        summary = (
+            analytics_data.get('student_performance_summary')
+            or summarize_student_performance(student_performance)
+        )
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Performance category distribution
-            category_counts = performance_df['category'].value_counts()
+            category_counts = summary['category_counts']
             
             fig_pie = px.pie(
-                values=category_counts.values,
-                names=category_counts.index,
+                values=list(category_counts.values()),
+                names=list(category_counts.keys()),
                 title="Student Performance Distribution",
                 color_discrete_map={
                     'Excellent': '#10b981',
@@ -253,33 +296,61 @@ class AnalyticsPage:
         with col2:
             # Top performers
             st.markdown("#### 🏆 Top Performers")
-            top_performers = performance_df.nlargest(10, 'attendance_percentage')
+            top_performers = _records_frame(summary['top_performers'])
             
-            for idx, student in top_performers.iterrows():
-                with st.container():
-                    col_name, col_rate, col_status = st.columns([2, 1, 1])
-                    
-                    with col_name:
-                        st.write(f"**{student['name']}**")
-                        st.caption(f"{student['roll_number']} - {student['course']}")
-                    
-                    with col_rate:
-                        st.metric("Rate", f"{student['attendance_percentage']:.1f}%")
-                    
-                    with col_status:
-                        st.write(f"{student['status']} {student['category']}")
+            # One table instead of a container + three columns per student
+            st.dataframe(
+                top_performers.assign(
+                    category=top_performers['status'] + ' ' + top_performers['category']
+                )[['name', 'roll_number', 'course', 'attendance_percentage', 'category']],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "name": "Student Name",
+                    "roll_number": "Roll Number",
+                    "course": "Course",
+                    "attendance_percentage": st.column_config.NumberColumn(
+                        "Rate",
+                        format="%.1f%%"
+                    ),
+                    "category": "Status"
+                }
+            )
         
         # Detailed performance table
         st.markdown("#### 📋 Detailed Performance Report")
+        # Lowercased "name\nroll" keys, built once per render; a search term (single line) can't span both fields
+        search_keys = (
+            performance_df['name'].fillna('').str.lower() + '\n' + performance_df['roll_number'].fillna('').str.lower()
+        )
+        self._render_performance_search(performance_df, search_keys)
+        
+        # Performance insights
+        st.markdown("#### 💡 Performance Insights")
+        
+        excellent_count = summary['excellent_count']
+        poor_count = summary['poor_count']
+        avg_attendance = summary['avg_attendance']
         
+        insight_col1, insight_col2, insight_col3 = st.columns(3)
+        
+        with insight_col1:
+            st.metric("🌟 Excellent Performers", excellent_count)
+        
+        with insight_col2:
+            st.metric("⚠️ Need Attention", poor_count)
+        
+        with insight_col3:
+            st.metric("📊 Class Average", f"{avg_attendance:.1f}%")
+    
+    @_fragment
+    def _render_performance_search(self, performance_df: pd.DataFrame, search_keys: pd.Series):
+        """Search box and detailed table; keystrokes rerun only this block, not the charts"""
         # Add search functionality
         search_term = st.text_input("🔍 Search students", placeholder="Enter name or roll number")
         
         if search_term:
-            filtered_df = performance_df[
-                performance_df['name'].str.contains(search_term, case=False, na=False) |
-                performance_df['roll_number'].str.contains(search_term, case=False, na=False)
-            ]
+            filtered_df = performance_df[search_keys.str.contains(search_term.lower(), regex=False)]
         else:
             filtered_df = performance_df
         
@@ -301,24 +372,6 @@ class AnalyticsPage:
                 "late_days": "Late Days"
             }
         )
-        
-        # Performance insights
-        st.markdown("#### 💡 Performance Insights")
-        
-        excellent_count = (performance_df['category'] == 'Excellent').sum()
-        poor_count = (performance_df['category'] == 'Poor').sum()
-        avg_attendance = performance_df['attendance_percentage'].mean()
-        
-        insight_col1, insight_col2, insight_col3 = st.columns(3)
-        
-        with insight_col1:
-            st.metric("🌟 Excellent Performers", excellent_count)
-        
-        with insight_col2:
-            st.metric("⚠️ Need Attention", poor_count)
-        
-        with insight_col3:
-            st.metric("📊 Class Average", f"{avg_attendance:.1f}%")
     
     def _render_course_analytics(self, analytics_data: Dict):
         """Render course-wise analytics"""
@@ -331,7 +384,7 @@ class AnalyticsPage:
             st.info("📊 No course data available")
             return
         
-        course_df = pd.DataFrame(course_analytics)
+        course_df = _records_frame(course_analytics)
         
         # Course comparison chart
         fig = px.bar(
@@ -387,7 +440,7 @@ class AnalyticsPage:
             hourly_data = time_patterns.get('hourly_checkins', [])
             
             if hourly_data:
-                hourly_df = pd.DataFrame(hourly_data)
+                hourly_df = _records_frame(hourly_data)
                 
                 fig_hourly = px.bar(
                     hourly_df,
@@ -408,7 +461,7 @@ class AnalyticsPage:
             weekly_data = time_patterns.get('weekly_patterns', [])
             
             if weekly_data:
-                weekly_df = pd.DataFrame(weekly_data)
+                weekly_df = _records_frame(weekly_data)
                 
                 fig_weekly = px.bar(
                     weekly_df,
@@ -500,12 +553,12 @@ class AnalyticsPage:
         student_performance = analytics_data.get('student_performance', [])
         
         if student_performance:
-            df = pd.DataFrame(student_performance)
-            csv = df.to_csv(index=False)
+            df = _records_frame(student_performance)
+            csv_data = df.to_csv(index=False)
             
             st.download_button(
                 label="📥 Download Student Report",
-                data=csv,
+                data=csv_data,
                 file_name=f"student_performance_{date.today()}.csv",
                 mime="text/csv",
                 use_container_width=True
@@ -518,12 +571,12 @@ class AnalyticsPage:
         course_analytics = analytics_data.get('course_analytics', [])
         
         if course_analytics:
-            df = pd.DataFrame(course_analytics)
-            csv = df.to_csv(index=False)
+            df = _records_frame(course_analytics)
+            csv_data = df.to_csv(index=False)
             
             st.download_button(
                 label="📥 Download Course Report",
-                data=csv,
+                data=csv_data,
                 file_name=f"course_analytics_{date.today()}.csv",
                 mime="text/csv",
                 use_container_width=True
@@ -544,13 +597,16 @@ class AnalyticsPage:
                 'Course Analytics': len(analytics_data.get('course_analytics', []))
             }
             
-            # Convert to DataFrame for export
-            report_df = pd.DataFrame([report_data])
-            csv = report_df.to_csv(index=False)
+            # Single header + value row; write it directly rather than via a one-row DataFrame
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator='\n')
+            writer.writerow(report_data.keys())
+            writer.writerow(report_data.values())
+            csv_data = buffer.getvalue()
             
             st.download_button(
                 label="📥 Download Comprehensive Report",
-                data=csv,
+                data=csv_data,
                 file_name=f"comprehensive_analytics_{date.today()}.csv",
                 mime="text/csv",
                 use_container_width=True
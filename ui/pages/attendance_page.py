@@ -7,10 +7,10 @@ import streamlit as st
 import cv2
 import numpy as np
 import logging
-from collections import defaultdict
 from datetime import date, datetime
 from typing import Optional, Dict, Tuple
 from services.attendance_service import AttendanceService
+from face_recognition.image_utils import get_face_cascade
 from config.settings import RECOGNITION_THRESHOLD, RECOGNITION_MARGIN
 from ui.components.forms import AttendanceForm
 from ui.components.layout import render_page_header, section_title, card_container
@@ -78,18 +78,25 @@ class AttendancePage:
     def _render_camera_section(self, debug_mode: bool = False):
         """Render camera input section"""
         # Camera input using form component
-        camera_input = AttendanceForm.render_camera_input()
+        # The form decodes the capture once; fall back to the raw file only if decoding failed
+        camera_input, camera_image = AttendanceForm.render_camera_input()
         
         if camera_input is not None:
-            self._process_attendance_image(camera_input, debug_mode, source="camera")
+            self._process_attendance_image(
+                camera_image if camera_image is not None else camera_input, debug_mode, source="camera",
+                preview=camera_input
+            )
         
         st.markdown("---")
         
         # Alternative file upload
-        uploaded_file = AttendanceForm.render_file_upload()
+        uploaded_file, uploaded_image = AttendanceForm.render_file_upload()
         
         if uploaded_file is not None:
-            self._process_attendance_image(uploaded_file, debug_mode, source="upload")
+            self._process_attendance_image(
+                uploaded_image if uploaded_image is not None else uploaded_file, debug_mode, source="upload",
+                preview=uploaded_file
+            )
     
     def _render_summary_section(self):
         """Render today's summary section"""
@@ -124,8 +131,13 @@ class AttendancePage:
             logger.error(f"Error rendering summary: {e}")
             st.error(f"Error: {str(e)}")
     
-    def _process_attendance_image(self, image_input, debug_mode: bool = False, source: str = "camera"):
-        """Process attendance marking from image with proper format handling"""
+    def _process_attendance_image(self, image_input, debug_mode: bool = False, source: str = "camera",
+                                  preview=None):
+        """Process attendance marking from image with proper format handling
+        
+        ``preview`` is the original uploaded/captured file; debug views display its
+        bytes as-is instead of re-encoding the decoded array.
+        """
         
         # Step 1: Convert image to proper format
         with st.spinner("🔧 Converting image format..."):
@@ -174,7 +186,7 @@ class AttendancePage:
                 if success and student_info:
                     self._show_recognition_success(student_info, message)
                 else:
-                    self._show_recognition_failure(message, processed_image, debug_mode)
+                    self._show_recognition_failure(message, processed_image, debug_mode, preview=preview)
                     
             except Exception as e:
                 logger.error(f"Error processing attendance: {e}")
@@ -190,27 +202,20 @@ class AttendancePage:
             processed_image = None
             
             # Handle different input types
-            if hasattr(image_input, 'read'):
-                # File upload case
-                if debug_mode:
-                    st.info(f"Processing uploaded file: {image_input.name}")
-                
-                file_bytes = image_input.read()
-                nparr = np.frombuffer(file_bytes, np.uint8)
-                processed_image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-            elif hasattr(image_input, 'getvalue'):
-                # Camera input case
+            if hasattr(image_input, 'getvalue') or hasattr(image_input, 'read'):
+                # Uploaded file or camera capture
                 if debug_mode:
-                    st.info("Processing camera input")
+                    st.info(f"Processing {getattr(image_input, 'name', 'camera input')}")
                 
-                file_bytes = image_input.getvalue()
-                nparr = np.frombuffer(file_bytes, np.uint8)
-                processed_image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                # getvalue() hands back the whole buffer regardless of the read position;
+                # frombuffer wraps those bytes without copying them
+                file_bytes = image_input.getvalue() if hasattr(image_input, 'getvalue') else image_input.read()
+                processed_image = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
                 
             elif isinstance(image_input, np.ndarray):
-                # Already numpy array
-                processed_image = image_input.copy()
+                # Already decoded (AttendanceForm returns a fresh BGR array); the
+                # conversions below all return new arrays, so no defensive copy
+                processed_image = image_input
                 
             else:
                 if debug_mode:
@@ -265,13 +270,14 @@ class AttendancePage:
             if image.dtype == np.uint8:
                 return image
             
-            if image.dtype in [np.float32, np.float64]:
-                if image.max() <= 1.0:
-                    return (image * 255).astype(np.uint8)
-                else:
-                    return np.clip(image, 0, 255).astype(np.uint8)
-            else:
-                return np.clip(image, 0, 255).astype(np.uint8)
+            if image.dtype in [np.float32, np.float64] and image.max() <= 1.0:
+                # Normalised float image: one scaled float32 temporary instead of a float64 one
+                image = np.multiply(image, 255, dtype=np.float32)
+            
+            # Clip straight into the uint8 result (the cast truncates, as astype did)
+            out = np.empty(image.shape, dtype=np.uint8)
+            np.clip(image, 0, 255, out=out, casting='unsafe')
+            return out
                 
         except Exception as e:
             logger.error(f"Error converting to uint8: {e}")
@@ -329,7 +335,7 @@ class AttendancePage:
         # Celebration
         st.balloons()
     
-    def _show_recognition_failure(self, message: str, image, debug_mode: bool = False):
+    def _show_recognition_failure(self, message: str, image, debug_mode: bool = False, preview=None):
         """Show recognition failure with optional debug analysis"""
         st.error("❌ Face not recognized")
         st.warning(f"Details: {message}")
@@ -339,7 +345,7 @@ class AttendancePage:
             
             # Show image analysis
             try:
-                self._show_debug_analysis(image)
+                self._show_debug_analysis(image, preview=preview)
             except Exception as e:
                 st.error(f"Debug analysis failed: {e}")
             
@@ -389,8 +395,11 @@ class AttendancePage:
                 """
             )
     
-    def _show_debug_analysis(self, image):
-        """Show debug analysis of the image"""
+    def _show_debug_analysis(self, image, preview=None):
+        """Show debug analysis of the image (``preview``: original file bytes to display, if any)"""
+        # One grayscale conversion shared by the quality and face detection checks
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        
         with st.expander("🔍 Image Analysis", expanded=True):
             col1, col2 = st.columns(2)
             
@@ -400,15 +409,17 @@ class AttendancePage:
                 st.write(f"Data type: {image.dtype}")
                 st.write(f"Value range: [{image.min()}, {image.max()}]")
                 
-                # Show the image
-                st.image(image, caption="Input Image", width=200)
+                # Show the original upload as-is; fall back to the (BGR) array
+                st.image(preview if preview is not None else image, caption="Input Image", width=200,
+                         channels="BGR")
             
             with col2:
                 st.markdown("**Quality Analysis:**")
                 
-                # Brightness analysis
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-                brightness = np.mean(gray)
+                # Brightness and contrast in one pass
+                mean, std = cv2.meanStdDev(gray)
+                brightness = float(mean[0, 0])
+                contrast = float(std[0, 0])
                 
                 if brightness < 80:
                     st.error(f"❌ Too dark: {brightness:.1f}")
@@ -418,14 +429,14 @@ class AttendancePage:
                     st.success(f"✅ Good brightness: {brightness:.1f}")
                 
                 # Contrast analysis
-                contrast = np.std(gray)
                 if contrast < 30:
                     st.error(f"❌ Low contrast: {contrast:.1f}")
                 else:
                     st.success(f"✅ Good contrast: {contrast:.1f}")
                 
-                # Blur analysis
-                blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
+                # Blur analysis (Laplacian variance); int16 holds the 3x3 response of uint8 input exactly
+                _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+                blur_score = float(lap_std[0, 0]) ** 2
                 if blur_score < 100:
                     st.error(f"❌ Blurry image: {blur_score:.1f}")
                 else:
@@ -434,9 +445,7 @@ class AttendancePage:
         # Face detection analysis
         with st.expander("👤 Face Detection Analysis", expanded=True):
             try:
-                face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(50, 50))
+                faces = get_face_cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(50, 50))
                 
                 if len(faces) == 0:
                     st.error("❌ No faces detected")
@@ -466,21 +475,19 @@ class AttendancePage:
     def _show_student_comparison_analysis(self, image):
         """Show analysis of comparison with registered students"""
         try:
-            # Get all students
-            from database.student_repository import StudentRepository
-            student_repo = StudentRepository()
-            student_embeddings = student_repo.get_student_embeddings()
+            # Same gallery (and int8 path) recognition just scored against, built once per roster change
+            gallery = self.attendance_service.student_service.get_recognition_gallery()
             
-            if not student_embeddings:
+            if not len(gallery.student_ids):
                 st.error("❌ No students registered in the system")
                 st.info("💡 Register students first in Student Management")
                 return
             
-            st.success(f"✅ Found {len(student_embeddings)} registered students")
+            st.success(f"✅ Found {len(gallery.student_ids)} registered students")
             
             # Try to generate embedding for input image
-            from face_recognition.recognition_engine import FaceRecognitionEngine
-            face_engine = FaceRecognitionEngine()
+            from face_recognition.recognition_engine import gallery_similarities, get_face_engine
+            face_engine = get_face_engine()
             
             input_embedding = face_engine.generate_embedding(image, debug_mode=True)
             
@@ -490,23 +497,24 @@ class AttendancePage:
             
             st.success("✅ Generated embedding for input image")
             
-            # Per-template scores, then aggregate max per student (matches live recognition)
-            by_student = defaultdict(list)
-            for student_id, name, roll_number, known_embedding in student_embeddings:
-                try:
-                    similarity = face_engine.cosine_similarity(input_embedding, known_embedding)
-                    by_student[student_id].append((name, roll_number, similarity))
-                except Exception as e:
-                    by_student[student_id].append((name, roll_number, 0.0))
-                    logger.warning("Similarity error: %s", e)
-
-            student_best = []
-            for sid, rows in by_student.items():
-                name, roll = rows[0][0], rows[0][1]
-                best_s = max(r[2] for r in rows)
-                student_best.append({"student_id": sid, "name": name, "roll_number": roll, "similarity": best_s})
-
-            student_best.sort(key=lambda x: x["similarity"], reverse=True)
+            # Per-template scores in one GEMV, then max per student (matches live recognition)
+            similarities = gallery_similarities(gallery, input_embedding)
+            best_per_student = np.zeros(len(gallery.student_ids), dtype=np.float32)
+            np.maximum.at(best_per_student, gallery.row_student, similarities)
+            
+            # Only the top 5 are shown; select them in O(S) and sort just those
+            k = min(5, len(best_per_student))
+            top = np.argpartition(-best_per_student, k - 1)[:k]
+            top = top[np.argsort(-best_per_student[top], kind="stable")]
+            student_best = [
+                {
+                    "student_id": int(gallery.student_ids[i]),
+                    "name": gallery.students[i][0],
+                    "roll_number": gallery.students[i][1],
+                    "similarity": float(best_per_student[i]),
+                }
+                for i in top.tolist()
+            ]
 
             st.caption(
                 f"Decision uses max similarity per student, threshold ≥ {RECOGNITION_THRESHOLD}, "
@@ -554,9 +562,8 @@ class AttendancePage:
         st.markdown("### 📝 Manual Attendance Entry")
         
         try:
-            from database.student_repository import StudentRepository
-            student_repo = StudentRepository()
-            students = student_repo.get_all_students()
+            # Served from the student service's roster cache rather than a fresh query
+            students = self.attendance_service.student_service.get_all_students()
             
             if not students:
                 st.error("❌ No students registered!")
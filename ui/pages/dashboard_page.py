@@ -197,8 +197,8 @@ class DashboardPage:
         st.markdown("---")
         st.markdown("### 🎨 Theme")
         try:
-            from ui.components.theme_toggle import theme_toggle
-            theme_toggle.render_toggle_button()
+            from ui.components.theme_toggle import render_theme_toggle
+            render_theme_toggle()
         except ImportError:
             pass  # Theme toggle not available
         
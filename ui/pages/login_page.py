@@ -9,7 +9,7 @@ from typing import Optional, Dict, Tuple
 from auth.authentication import AuthenticationService
 from auth.session_manager import SessionManager
 from ui.components.forms import LoginForm, SignupForm
-from ui.components.theme_toggle import theme_toggle
+from ui.components.theme_toggle import render_theme_toggle
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +27,7 @@ class LoginPage:
         """Render complete login page"""
         _, _, top_right = st.columns([6, 2, 2])
         with top_right:
-            theme_toggle.render_toggle_button()
+            render_theme_toggle()
 
         st.title("Smart Face Attendance")
         st.caption("Sign in with your registered email, or use Forgot Password if needed.")
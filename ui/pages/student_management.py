@@ -6,8 +6,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import cv2
+import os
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from typing import List, Dict, Optional
 
@@ -15,6 +17,16 @@ from ui.components.layout import render_page_header, section_title, card_contain
 
 logger = logging.getLogger(__name__)
 
+
+def _decode_image(file_bytes: bytes) -> Optional[np.ndarray]:
+    """Decode encoded image bytes to a BGR array (None if empty or undecodable)"""
+    if not file_bytes:
+        return None
+    try:
+        return cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error:
+        return None
+
 class StudentManagementPage:
     """Student management page component - complete working version"""
     
@@ -269,13 +281,23 @@ class StudentManagementPage:
         progress_bar = st.progress(0)
         status_text = st.empty()
         
+        # Decode all photos concurrently (cv2.imdecode releases the GIL), at most one thread
+        # per core; the per-image feedback below must stay on the script thread
+        file_bytes = [uploaded_file.getvalue() for uploaded_file in uploaded_files]
+        workers = max(1, min(len(file_bytes), os.cpu_count() or 4))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            decoded_images = list(executor.map(_decode_image, file_bytes))
+        
         for i, uploaded_file in enumerate(uploaded_files):
             status_text.text(f"Processing image {i+1}/{len(uploaded_files)}...")
             progress_bar.progress((i + 1) / len(uploaded_files))
             
             try:
                 # Process each image
-                processed_image = self._convert_uploaded_file(uploaded_file, debug_mode, i+1)
+                processed_image = self._convert_uploaded_file(
+                    uploaded_file, debug_mode, i+1, file_bytes=file_bytes[i], image=decoded_images[i],
+                    decoded=True
+                )
                 
                 if processed_image is not None:
                     image_data.append(processed_image)
@@ -325,22 +347,28 @@ class StudentManagementPage:
         
         return image_data
     
-    def _convert_uploaded_file(self, uploaded_file, debug_mode: bool = False, image_num: int = 0) -> Optional[np.ndarray]:
-        """Convert uploaded file to OpenCV format with comprehensive error handling"""
+    def _convert_uploaded_file(self, uploaded_file, debug_mode: bool = False, image_num: int = 0,
+                               file_bytes: Optional[bytes] = None,
+                               image: Optional[np.ndarray] = None,
+                               decoded: bool = False) -> Optional[np.ndarray]:
+        """Convert uploaded file to OpenCV format with comprehensive error handling
+        
+        file_bytes/image may carry the file's already-read bytes and decoded frame;
+        decoded=True means ``image`` is the result of a decode attempt (None if it failed).
+        """
         try:
             # Read file bytes
-            file_bytes = uploaded_file.read()
+            if file_bytes is None:
+                file_bytes = uploaded_file.read()
             
             if len(file_bytes) == 0:
                 if debug_mode:
                     st.error(f"❌ Image {image_num}: Empty file")
                 return None
             
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(file_bytes, np.uint8)
-            
-            # Decode image using OpenCV
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Decode image using OpenCV (unless the caller already tried)
+            if not decoded:
+                image = _decode_image(file_bytes)
             
             if image is None:
                 if debug_mode:
@@ -9,6 +9,8 @@ from pathlib import Path
 from typing import Dict, List, Any
 import logging
 
+from utils.cache import analytics_cache
+
 logger = logging.getLogger(__name__)
 
 class BackupManager:
@@ -162,6 +164,7 @@ class BackupManager:
                               record['marked_by'], record['created_at']))
                 
                 conn.commit()
+                analytics_cache.clear()
                 logger.info("Data import completed successfully")
                 return True
                 
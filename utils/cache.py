@@ -0,0 +1,112 @@
+"""
+In-process caching utilities.
+
+A small thread-safe TTL cache for memoising read-mostly query results within
+one app process. SQLite remains the source of truth; entries expire after their
+TTL, and writers can purge dependent entries early by tag.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, Iterable, Set
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        # Bumped on every invalidate_tag, so holders of state outside the cache can detect writes
+        self._tag_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key: Hashable):
+        expires_at, value, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value, _ = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any], tags: Iterable[str] = ()) -> Any:
+        """Return the cached value for ``key``, computing and storing it on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.set(key, value, tags)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored with ``tag``; returns the number removed."""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            return len(keys)
+
+    def tag_version(self, tag: str) -> int:
+        """Counter that changes whenever ``tag`` (or the whole cache) is invalidated."""
+        with self._lock:
+            return self._tag_versions.setdefault(tag, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+            for tag in self._tag_versions:
+                self._tag_versions[tag] += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+def attendance_date_tag(day) -> str:
+    """Cache tag for entries derived from attendance rows on ``day``."""
+    return f"attendance:date:{day.isoformat() if isinstance(day, date) else day}"
+
+
+# Tag for entries derived from the set of active students (enrolment, deletion)
+STUDENTS_TAG = "students"
+
+
+# Shared by analytics readers; attendance and student writers invalidate it by tag
+analytics_cache = TTLCache(maxsize=256, ttl=300)